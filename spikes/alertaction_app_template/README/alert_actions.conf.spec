@@ -17,3 +17,5 @@
 # TODO: Define required parameters below
 # param.<key_name> = <input_type> (e.g. <string>)
 param.display_title = <string>
+param.per_result = [0|1]
+param.max_concurrency = <integer>
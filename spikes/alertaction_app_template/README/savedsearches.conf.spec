@@ -19,3 +19,5 @@ action.alertaction_template = 1
 # TODO: Add all alert instance-specific parameters below.
 # action.<alertaction_name>.param.<key> = <type> (e.g. <string>)
 action.alertaction_template.param.message = <string>
+action.alertaction_template.param.per_result = [0|1]
+action.alertaction_template.param.group_by = <string>
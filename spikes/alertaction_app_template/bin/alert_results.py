@@ -0,0 +1,81 @@
+"""
+Reads the results of the search that fired an alert, and runs an action for
+each of them.
+
+The alert payload only carries the first result, in "result". Every result
+is in the gzipped CSV file named by "results_file", which is read here one
+row at a time, so alerts with many results do not have to fit in memory.
+"""
+
+import sys
+import csv
+import gzip
+import threading
+import Queue
+
+# Splunk results can hold large _raw values
+csv.field_size_limit(10 * 1024 * 1024)
+
+# whether a checkbox parameter of the alert action, such as per_result, is set
+def flag(config, name):
+    return str(config.get(name, '0')).strip().lower() in ('1', 'true', 'yes')
+
+# yields each result in a results_file as a dict, without the __mv_ columns
+# Splunk adds to carry multivalue fields
+def iter_results(path):
+    with gzip.open(path, 'rb') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [(i, name) for i, name in enumerate(header) if not name.startswith('__mv_')]
+        for row in reader:
+            yield dict((name, row[i]) for i, name in columns if i < len(row))
+
+# yields the first result for each value of a field, remembering only the
+# values seen so far
+def unique_by(results, field):
+    seen = set()
+    for result in results:
+        key = result.get(field)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield result
+
+# calls action(item) for every item, on up to max_workers threads at once;
+# items are read as the threads get to them. An action that returns False
+# or raises counts as failed. Returns the numbers of succeeded and failed
+# actions.
+def run_concurrently(items, action, max_workers=8):
+    done = object()
+    queue = Queue.Queue(max_workers * 2)
+    counts = {'succeeded': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            item = queue.get()
+            if item is done:
+                return
+            try:
+                ok = action(item) is not False
+            except Exception, e:
+                print >> sys.stderr, "ERROR Action failed: %s" % e
+                ok = False
+            with lock:
+                counts['succeeded' if ok else 'failed'] += 1
+
+    threads = [threading.Thread(target=work) for i in range(max(1, max_workers))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for item in items:
+            queue.put(item)
+    finally:
+        for thread in threads:
+            queue.put(done)
+        for thread in threads:
+            thread.join()
+    return counts['succeeded'], counts['failed']
@@ -0,0 +1,78 @@
+"""
+Compiles the templates of alert titles and messages once, and renders them
+for any number of results.
+
+A template can name fields of a result the way string.Template does, as
+$field or ${field}, or the way tokens in savedsearches.conf do, as
+$result.field$. $$ is a literal $. A field missing from a result renders as
+an empty string for $result.field$ tokens, and is left as written for the
+others, as string.Template.safe_substitute does.
+
+Each template is parsed into a format string and the names of the fields it
+fills in, the first time it is used, so rendering a result is a dictionary
+lookup per field and one string format.
+"""
+
+import re
+from operator import itemgetter
+
+TOKEN = re.compile(r'\$(?:(\$)|result\.([\w.:-]+)\$|\{([_a-z][_a-z0-9]*)\}|([_a-z][_a-z0-9]*))',
+                   re.IGNORECASE)
+MAX_CACHED = 256
+
+_cache = {}
+
+# returns the compiled template for a template text, compiling it only the
+# first time
+def get_template(text):
+    template = _cache.get(text)
+    if template is None:
+        if len(_cache) >= MAX_CACHED:
+            _cache.clear()
+        template = _cache[text] = CompiledTemplate(text)
+    return template
+
+class CompiledTemplate(object):
+    def __init__(self, text):
+        self.text = text
+        parts = []
+        fields = []
+        position = 0
+        for match in TOKEN.finditer(text):
+            parts.append(text[position:match.start()].replace('%', '%%'))
+            position = match.end()
+            if match.group(1):
+                parts.append('$')
+                continue
+            parts.append('%s')
+            if match.group(2):
+                fields.append((match.group(2), ''))
+            else:
+                fields.append((match.group(3) or match.group(4), match.group(0)))
+        parts.append(text[position:].replace('%', '%%'))
+        self.format = ''.join(parts)
+        self.fields = tuple(fields)
+        if len(fields) > 1:
+            self.getter = itemgetter(*[name for name, _ in fields])
+
+    def render(self, result):
+        return self.render_all([result])[0]
+
+    # renders the template for each of a list of results
+    def render_all(self, results):
+        fields = self.fields
+        if not fields:
+            return [self.format % ()] * len(results)
+        format = self.format
+        if len(fields) == 1:
+            name, missing = fields[0]
+            return [format % (result.get(name, missing),) for result in results]
+        getter = self.getter
+        rendered = []
+        for result in results:
+            try:
+                values = getter(result)
+            except KeyError:
+                values = tuple([result.get(name, missing) for name, missing in fields])
+            rendered.append(format % values)
+        return rendered
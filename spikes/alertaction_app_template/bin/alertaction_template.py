@@ -12,6 +12,13 @@ Alert action message payload contents include:
     * First search result - All extracted field values from the first search
       result (useful in certain situations).
 
+Every search result is in the gzipped CSV file named by "results_file". With
+per_result set, the action runs once for every result (or once for each value
+of the group_by field), up to max_concurrency at a time, reading the file one
+row at a time with the helpers in alert_results.py. Results are rendered in
+batches, with the title and message templates compiled once by
+alert_templates.py.
+
    The structure of the JSON payload looks like:
 
     {
@@ -43,23 +50,48 @@ by your script.  To find your logs, go to 'Settings' > 'Alert Actions' and selec
 import sys
 import json
 import urllib2
-from string import Template
+from itertools import islice
 from subprocess import call
 
+import alert_results
+import alert_templates
+
+MAX_CONCURRENCY = 8
+BATCH_SIZE = 500
+
 
 def send_message(result, config):
+    send_messages([result or {}], config)
+
+
+# renders the title and message for a batch of results in one pass,
+# then sends each of them
+def send_messages(results, config):
     # retrieve endpoint url
     message = config.get('message')
-    message_text = '<no message supplied>'
+    message_texts = ['<no message supplied>'] * len(results)
 
     title = config.get('display_title')
+    titles = [title] * len(results)
 
     if message:
-        message_text = Template(message).safe_substitute(result)
+        message_texts = alert_templates.get_template(message).render_all(results)
+    if title:
+        titles = alert_templates.get_template(title).render_all(results)
+
+    for title, message_text in zip(titles, message_texts):
+        # Do something cool.
+        print >> sys.stderr, "INFO Title: {}".format(title)
+        print >> sys.stderr, "INFO Message: {}".format(message_text)
+
 
-    # Do something cool.
-    print >> sys.stderr, "INFO Title: {}".format(title)
-    print >> sys.stderr, "INFO Message: {}".format(message_text)
+def batches(results, size):
+    results = iter(results)
+    while True:
+        batch = list(islice(results, size))
+        if not batch:
+            return
+        yield batch
 
 
 if __name__ == "__main__":
@@ -69,7 +101,17 @@ if __name__ == "__main__":
             payload = json.loads(sys.stdin.read())
             config = payload.get('configuration')
 
-            send_message(payload.get('result'), config)
+            results_file = payload.get('results_file')
+            if alert_results.flag(config, 'per_result') and results_file:
+                results = alert_results.iter_results(results_file)
+                if config.get('group_by'):
+                    results = alert_results.unique_by(results, config.get('group_by'))
+                concurrency = int(config.get('max_concurrency') or MAX_CONCURRENCY)
+                sent, failed = alert_results.run_concurrently(
+                    batches(results, BATCH_SIZE), lambda batch: send_messages(batch, config), concurrency)
+                print >> sys.stderr, "INFO Sent %d batches of messages, %d failed" % (sent, failed)
+            else:
+                send_message(payload.get('result'), config)
         except Exception, e:
             print >> sys.stderr, "ERROR Unexpected error: %s" % e
             sys.exit(3)
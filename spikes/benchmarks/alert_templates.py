@@ -0,0 +1,54 @@
+"""Measures how fast alertaction_template.py renders messages for many results.
+
+Renders a title and a message for each of a number of results, first the way
+send_message used to, building a string.Template for every result, then with
+the templates compiled once by alert_templates.py and rendered a batch at a
+time. Reports results/s for each.
+
+Usage: python alert_templates.py [results]
+"""
+
+import os
+import sys
+import time
+from string import Template
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alertaction_app_template', 'bin'))
+import alert_templates
+
+TITLE = 'Terminated User Access: ${user_id}'
+MESSAGE = ('The user ${user_id} has accessed ${count} files on $host '
+           'in the past hour, last at $result._time$.')
+BATCH_SIZE = 500
+
+
+def results(count):
+    return [{'user_id': 'user%d' % i, 'count': str(i % 50), 'host': 'fs%d' % (i % 8),
+             '_time': '2016-02-01T12:%02d:00' % (i % 60)} for i in xrange(count)]
+
+
+def per_result(rows):
+    for row in rows:
+        Template(TITLE).safe_substitute(row)
+        Template(MESSAGE).safe_substitute(row)
+
+
+def compiled(rows):
+    for first in xrange(0, len(rows), BATCH_SIZE):
+        batch = rows[first:first + BATCH_SIZE]
+        alert_templates.get_template(TITLE).render_all(batch)
+        alert_templates.get_template(MESSAGE).render_all(batch)
+
+
+def run(name, render, rows):
+    start = time.time()
+    render(rows)
+    elapsed = time.time() - start
+    print '%-12s %7d results %7.2fs %10.0f results/s' % (name, len(rows), elapsed, len(rows) / elapsed)
+
+
+if __name__ == '__main__':
+    rows = results(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    run('Template', per_result, rows)
+    run('compiled', compiled, rows)
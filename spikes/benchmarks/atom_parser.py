@@ -0,0 +1,130 @@
+"""Compares splunklib.data.load and splunklib.data.parse.
+
+Parses synthetic saved search and search job feeds shaped like the ones
+splunkd returns, checks that both functions produce the same records, and
+reports how long each one takes. The job feed is also parsed with parse()
+restricted to the keys a job poller needs.
+
+Usage: python atom_parser.py [entries]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+from splunklib import data
+
+FEED = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:s="http://dev.splunk.com/ns/rest" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+        '<title>%s</title><id>https://localhost:8089/services/%s</id>'
+        '<updated>2015-01-01T00:00:00+00:00</updated>'
+        '<opensearch:totalResults>%d</opensearch:totalResults>'
+        '<opensearch:itemsPerPage>%d</opensearch:itemsPerPage>'
+        '<opensearch:startIndex>0</opensearch:startIndex>\n%s</feed>')
+
+ENTRY = ('<entry><title>%(name)s</title>'
+         '<id>https://localhost:8089/servicesNS/nobody/search/%(path)s/%(name)s</id>'
+         '<updated>2015-01-01T00:00:00+00:00</updated>'
+         '<link href="/servicesNS/nobody/search/%(path)s/%(name)s" rel="alternate"/>'
+         '<author><name>nobody</name></author>'
+         '<link href="/servicesNS/nobody/search/%(path)s/%(name)s" rel="list"/>'
+         '<link href="/servicesNS/nobody/search/%(path)s/%(name)s/_reload" rel="_reload"/>'
+         '<link href="/servicesNS/nobody/search/%(path)s/%(name)s" rel="edit"/>'
+         '<content type="text/xml"><s:dict>%(keys)s'
+         '<s:key name="eai:acl"><s:dict>'
+         '<s:key name="app">search</s:key><s:key name="can_write">1</s:key>'
+         '<s:key name="modifiable">1</s:key><s:key name="owner">nobody</s:key>'
+         '<s:key name="perms"><s:dict>'
+         '<s:key name="read"><s:list><s:item>*</s:item></s:list></s:key>'
+         '<s:key name="write"><s:list><s:item>admin</s:item><s:item>power</s:item></s:list></s:key>'
+         '</s:dict></s:key><s:key name="sharing">app</s:key>'
+         '</s:dict></s:key></s:dict></content></entry>\n')
+
+
+ENTRY_TAG = '{http://www.w3.org/2005/Atom}entry'
+ENTRY_CONTENT = ENTRY_TAG + '/{http://www.w3.org/2005/Atom}content/*'
+
+
+def key(name, value):
+    return '<s:key name="%s">%s</s:key>' % (name, value)
+
+
+def saved_search_feed(entries):
+    names = ['action.email', 'action.email.to', 'action.script', 'alert.digest_mode',
+             'alert.expires', 'alert.severity', 'alert.suppress', 'alert_comparator',
+             'alert_threshold', 'alert_type', 'cron_schedule', 'description',
+             'disabled', 'dispatch.buckets', 'dispatch.earliest_time',
+             'dispatch.latest_time', 'dispatch.lookups', 'dispatch.max_count',
+             'dispatch.max_time', 'dispatch.spawn_process', 'dispatch.time_format',
+             'dispatch.ttl', 'displayview', 'is_scheduled', 'is_visible',
+             'max_concurrent', 'realtime_schedule', 'request.ui_dispatch_app',
+             'request.ui_dispatch_view', 'restart_on_searchpeer_add', 'run_on_startup',
+             'search', 'vsid']
+    body = []
+    for i in xrange(entries):
+        keys = ''.join(key(name, '%s value %d' % (name, i)) for name in names)
+        keys += key('next_scheduled_time', '')
+        keys += key('eai:attributes', '<s:dict>' + key('optionalFields', '<s:list>' +
+                    ''.join('<s:item>%s</s:item>' % name for name in names) +
+                    '</s:list>') + key('requiredFields', '<s:list><s:item>search</s:item></s:list>') +
+                    key('wildcardFields', '<s:list><s:item>action\..*</s:item></s:list>') + '</s:dict>')
+        body.append(ENTRY % {'name': 'saved search %d' % i, 'path': 'saved/searches', 'keys': keys})
+    return FEED % ('savedsearch', 'saved/searches', entries, entries, ''.join(body))
+
+
+def job_feed(entries):
+    names = ['cursorTime', 'delegate', 'diskUsage', 'dispatchState', 'doneProgress',
+             'dropCount', 'earliestTime', 'eventAvailableCount', 'eventCount',
+             'eventFieldCount', 'eventIsStreaming', 'eventIsTruncated', 'eventSearch',
+             'eventSorting', 'isDone', 'isFailed', 'isFinalized', 'isPaused',
+             'isPreviewEnabled', 'isRealTimeSearch', 'isRemoteTimeline', 'isSaved',
+             'isSavedSearch', 'isZombie', 'keywords', 'label', 'latestTime',
+             'numPreviews', 'priority', 'remoteSearch', 'reportSearch', 'resultCount',
+             'resultIsStreaming', 'resultPreviewCount', 'runDuration', 'scanCount',
+             'sid', 'statusBuckets', 'ttl']
+    body = []
+    for i in xrange(entries):
+        keys = ''.join(key(name, '%d' % (i * 7 % 1000)) for name in names)
+        keys += key('performance', '<s:dict>' + ''.join(
+            key('command.search.%s' % part, '<s:dict>' + key('duration_secs', '0.01') +
+                key('invocations', '3') + '</s:dict>')
+            for part in ['index', 'rawdata', 'kv', 'typer', 'fieldalias', 'lookups', 'tags']) + '</s:dict>')
+        keys += key('messages', '<s:dict/>')
+        keys += key('request', '<s:dict>' + key('search', 'search index=pas | stats count by user') + '</s:dict>')
+        body.append(ENTRY % {'name': 'search index=pas %d' % i, 'path': 'search/jobs', 'keys': keys})
+    return FEED % ('jobs', 'search/jobs', entries, entries, ''.join(body))
+
+
+def run(name, function, text, repeat=3):
+    best = None
+    for _ in xrange(repeat):
+        start = time.time()
+        result = function(text)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print '%-32s %8.3fs' % (name, best)
+    return result, best
+
+if __name__ == '__main__':
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    status_keys = ['content.sid', 'content.dispatchState', 'content.isDone']
+    for feed_name, text in [('saved searches', saved_search_feed(entries)),
+                            ('jobs', job_feed(entries))]:
+        print '%s: %d entries, %d bytes' % (feed_name, entries, len(text))
+        loaded, load_time = run('data.load', data.load, text)
+        parsed, parse_time = run('data.parse', data.parse, text)
+        assert loaded == parsed, 'parse() and load() disagree'
+        for match in [ENTRY_TAG, ENTRY_CONTENT]:
+            assert data.load(text, match) == data.parse(text, match), 'disagree on %s' % match
+        print '%-32s %7.1fx' % ('speedup', load_time / parse_time)
+        if feed_name == 'jobs':
+            partial, keys_time = run('data.parse(keys=%d)' % len(status_keys),
+                                     lambda t: data.parse(t, keys=status_keys), text)
+            # content also keeps its type attribute, as it does with load()
+            assert sorted(partial.feed.entry[0].content.keys()) == ['dispatchState', 'isDone', 'sid', 'type']
+            print '%-32s %7.1fx' % ('speedup', load_time / keys_time)
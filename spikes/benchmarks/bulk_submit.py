@@ -0,0 +1,79 @@
+"""Measures BulkSubmitter throughput against a local receivers/stream sink.
+
+A thread accepts the streams BulkSubmitter opens, reads the HTTP headers and
+counts the event lines that follow. Events are spread over a few sourcetypes,
+so several streams are open at once, and the events/s reported is the rate at
+which submitted events reach the sink.
+
+Usage: python bulk_submit.py [events]
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+from splunklib import client
+from splunklib.data import record
+
+
+class Sink(object):
+    def __init__(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        self.events = 0
+        self.streams = 0
+        self.lock = threading.Lock()
+        thread = threading.Thread(target=self.accept)
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while True:
+            connection, _ = self.listener.accept()
+            with self.lock:
+                self.streams += 1
+            thread = threading.Thread(target=self.read, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def read(self, connection):
+        data = ''
+        while '\r\n\r\n' not in data:
+            data += connection.recv(4096)
+        chunk = data.split('\r\n\r\n', 1)[1]
+        while chunk:
+            count = chunk.count('\n')
+            with self.lock:
+                self.events += count
+            chunk = connection.recv(1 << 16)
+
+
+def main(events):
+    sink = Sink()
+    service = client.Service(scheme='http', host='127.0.0.1', port=sink.port, token='Splunk x')
+    index = client.Index(service, client.PATH_INDEXES + 'main',
+                         state=record({'title': 'main', 'content': {}}))
+    line = '2015-01-01T00:00:00 user=user%d@example.com action=view bytes=%d'
+    start = time.time()
+    submitter = index.bulk_submitter(max_batch_size=256 << 10)
+    for i in xrange(events):
+        submitter.submit(line % (i % 500, i), sourcetype='bench:%d' % (i % 4))
+    submitter.close()
+    while sink.events < events and time.time() - start < 60:
+        time.sleep(0.01)
+    elapsed = time.time() - start
+    stats = submitter.stats
+    print '%d events submitted, %d sent in %d batches, %d received on %d streams' % (
+        stats.events_submitted, stats.events_sent, stats.batches_sent, sink.events, sink.streams)
+    print '%.3fs %10.0f events/s %8.1f MB/s' % (
+        elapsed, sink.events / elapsed, stats.bytes_sent / elapsed / (1 << 20))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
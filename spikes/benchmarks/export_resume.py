@@ -0,0 +1,93 @@
+"""Checks that an export continued by offset keeps the files of the run it
+continues.
+
+Streams results to splunklib.export.Exporter from a stub service whose
+connection drops part way through, with resume=None so the export fails.
+Checks that the failed export leaves only complete files, then continues it
+with the offset its error reports, and checks that the files of both runs
+hold every result exactly once, in order.
+
+Usage: python export_resume.py [results]
+"""
+
+import gzip
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+from splunklib.export import Exporter, ExportError
+
+
+class DroppingStream(object):
+    def __init__(self, text, drop_after):
+        self.text = text
+        self.position = 0
+        self.drop_after = drop_after
+
+    def read(self, size=None):
+        if self.drop_after is not None and self.position >= self.drop_after:
+            raise socket.error(104, 'Connection reset by peer')
+        end = len(self.text) if size is None else self.position + size
+        if self.drop_after is not None:
+            end = min(end, self.drop_after)
+        data = self.text[self.position:end]
+        self.position += len(data)
+        return data
+
+
+class StubJobs(object):
+    def __init__(self, count):
+        self.text = ''.join(json.dumps({'preview': False, 'result': {'n': str(i)}})
+                            for i in range(count))
+        self.drop_after = None
+
+    def export(self, query, **params):
+        return DroppingStream(self.text, self.drop_after)
+
+
+class StubService(object):
+    def __init__(self, count):
+        self.jobs = StubJobs(count)
+
+
+def read_files(directory):
+    numbers = []
+    for name in sorted(os.listdir(directory)):
+        assert not name.endswith('.part'), name
+        with gzip.open(os.path.join(directory, name)) as f:
+            numbers.extend(int(json.loads(line)['n']) for line in f)
+    return numbers
+
+
+def check(count):
+    directory = tempfile.mkdtemp()
+    try:
+        service = StubService(count)
+        exporter = Exporter(service, directory, max_file_results=100, resume=None)
+        service.jobs.drop_after = len(service.jobs.text) * 2 // 3
+        try:
+            exporter.export('search index=pas')
+            raise AssertionError('export did not fail')
+        except ExportError as e:
+            written = e.stats.results
+        first_files = sorted(os.listdir(directory))
+        assert read_files(directory) == range(written), 'failed export left a partial file'
+
+        service.jobs.drop_after = None
+        stats = exporter.export('search index=pas', offset=written)
+        assert all(name in os.listdir(directory) for name in first_files)
+        assert read_files(directory) == range(count), 'resumed export lost results'
+        print 'checks passed: %d results in %d files before the failure, %d in %d files after' % (
+            written, len(first_files), stats.results, len(stats.files))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    check(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
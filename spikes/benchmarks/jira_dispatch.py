@@ -0,0 +1,205 @@
+"""Measures how many JIRA tickets per second jira.py creates.
+
+Starts a stub JIRA server that answers each create-issue request after a
+fixed delay, then runs jira.py --execute once per ticket, a few at a time, as
+splunkd would, first sending each ticket from the alert process and then in
+worker mode,
+where the tickets are spooled and sent by the resident dispatcher. Then runs
+a single alert whose results_file holds one result per ticket, with
+per_result set. Reports tickets/s and how many connections the stub server
+saw. Finally fires a deduplicating alert a few times, one at a time and
+then several at once, and reports how many issues and comments it made;
+either way there should be one issue per user.
+
+Usage: python jira_dispatch.py [tickets] [server delay in seconds] [concurrent alerts]
+"""
+
+import BaseHTTPServer
+import csv
+import gzip
+import json
+import os
+import shutil
+import signal
+import SocketServer
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+JIRA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    '..', 'jira_alerts', 'bin', 'jira.py')
+
+
+class StubJira(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), StubJiraHandler)
+        self.delay = delay
+        self.issues = 0
+        self.comments = 0
+        self.connections = 0
+        self.deleted = set()
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass  # connections reset when the dispatcher is stopped
+
+
+class StubJiraHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        json.loads(self.rfile.read(int(self.headers['content-length'])))
+        time.sleep(self.server.delay)
+        if self.path.split('/')[-2] in self.server.deleted:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with self.server.lock:
+            if self.path.endswith('/comment'):
+                self.server.comments += 1
+                key = 'comment-%d' % self.server.comments
+            else:
+                self.server.issues += 1
+                key = 'PAS-%d' % self.server.issues
+        body = json.dumps({'id': key, 'key': key})
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def payload(url, i, worker):
+    return json.dumps({'configuration': {
+        'jira_url': url, 'username': 'admin', 'password': 'secret',
+        'project_key': 'PAS', 'issue_type': '3', 'worker': worker,
+        'summary': 'Terminated User Access: user%d' % i,
+        'description': 'The user user%d has accessed files 12 times in the past hour.' % i}})
+
+
+def fan_out_payload(url, results_file):
+    return json.dumps({'results_file': results_file, 'configuration': {
+        'jira_url': url, 'username': 'admin', 'password': 'secret',
+        'project_key': 'PAS', 'issue_type': '3', 'per_result': '1',
+        'summary': 'Terminated User Access: ${user_id}',
+        'description': 'The user ${user_id} has accessed files ${count} times in the past hour.'}})
+
+
+def write_results(path, tickets, users=None):
+    with gzip.open(path, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id', 'count', '__mv_user_id', '__mv_count'])
+        for i in range(tickets):
+            writer.writerow(['user%d' % (i % (users or tickets)), '12', '', ''])
+
+
+def execute(payload_text, env):
+    process = subprocess.Popen([sys.executable, JIRA, '--execute'], stdin=subprocess.PIPE, env=env)
+    process.stdin.write(payload_text)
+    process.stdin.close()
+    return process
+
+
+def run(name, server, tickets, worker, env, parallel):
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    server.issues = server.connections = 0
+    start = time.time()
+    for first in range(0, tickets, parallel):
+        processes = [execute(payload(url, i, worker), env)
+                     for i in range(first, min(first + parallel, tickets))]
+        for process in processes:
+            process.wait()
+    report(name, server, tickets, start)
+
+
+def run_fan_out(name, server, tickets, env):
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    results_file = os.path.join(env['SPLUNK_HOME'], 'results.csv.gz')
+    write_results(results_file, tickets)
+    server.issues = server.connections = 0
+    start = time.time()
+    execute(fan_out_payload(url, results_file), env).wait()
+    report(name, server, tickets, start)
+
+
+def run_dedup(name, server, firings, rows, users, env, parallel=1):
+    # each run starts with an empty index of the issues opened so far
+    env = dict(env, SPLUNK_HOME=tempfile.mkdtemp())
+    try:
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        results_file = os.path.join(env['SPLUNK_HOME'], 'results.csv.gz')
+        write_results(results_file, rows, users)
+        alert = json.loads(fan_out_payload(url, results_file))
+        alert['configuration']['dedup_fields'] = 'user_id'
+
+        def fire(count, parallel):
+            for first in range(0, count, parallel):
+                processes = [execute(json.dumps(alert), env)
+                             for i in range(first, min(first + parallel, count))]
+                for process in processes:
+                    process.wait()
+
+        server.issues = server.comments = 0
+        server.deleted = set()
+        start = time.time()
+        fire(firings, parallel)
+        elapsed = time.time() - start
+        print '%-8s %5d firings of %d results %7.2fs  (%d issues, %d comments)' % (
+            name, firings, rows, elapsed, server.issues, server.comments)
+        assert server.issues == users, 'expected %d issues' % users
+
+        # once the issues are deleted, the next firing forgets them, and the
+        # one after opens new ones
+        server.deleted = set('PAS-%d' % (i + 1) for i in range(server.issues))
+        fire(2, 1)
+        assert server.issues == 2 * users, 'expected %d new issues' % users
+    finally:
+        shutil.rmtree(env['SPLUNK_HOME'], ignore_errors=True)
+
+
+def report(name, server, tickets, start):
+    alerts_done = time.time() - start
+    while server.issues < tickets and time.time() - start < 120:
+        time.sleep(0.01)
+    elapsed = time.time() - start
+    print '%-8s %5d tickets %7.2fs %7.1f tickets/s  (alerts returned after %.2fs, %d connections)' % (
+        name, server.issues, elapsed, server.issues / elapsed, alerts_done, server.connections)
+
+
+if __name__ == '__main__':
+    tickets = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    parallel = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    server = StubJira(delay)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    splunk_home = tempfile.mkdtemp()
+    env = dict(os.environ, SPLUNK_HOME=splunk_home)
+    try:
+        run('direct', server, tickets, '0', env, parallel)
+        run('worker', server, tickets, '1', env, parallel)
+        run_fan_out('per row', server, tickets, env)
+        run_dedup('dedup', server, 10, tickets, 20, env)
+        run_dedup('overlap', server, 10, tickets, 20, env, parallel)
+    finally:
+        # stop the dispatcher, whose pid is in its lock file
+        try:
+            with open(os.path.join(splunk_home, 'var', 'spool', 'jira_alerts', 'dispatcher.lock')) as f:
+                os.kill(int(f.read()), signal.SIGTERM)
+        except (IOError, OSError, ValueError):
+            pass
+        shutil.rmtree(splunk_home, ignore_errors=True)
@@ -0,0 +1,79 @@
+"""Measures how long a JIRA alert takes while the JIRA endpoint is unhealthy.
+
+Runs jira.py --execute a number of times against the stub JIRA server of
+jira_dispatch.py, while it is healthy, while it answers every request only
+after longer than the request timeout, and while it answers 503 to the first
+few requests. Reports how long the alerts took, and how long it took until
+every ticket had been opened, retries included.
+
+Usage: python jira_retry.py [alerts]
+"""
+
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from jira_dispatch import StubJira, StubJiraHandler, execute, payload
+
+
+class FlakyJiraHandler(StubJiraHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failing = server.requests <= server.failures
+        if failing:
+            self.rfile.read(int(self.headers['content-length']))
+            time.sleep(server.stall)
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        StubJiraHandler.do_POST(self)
+
+
+def run(name, server, alerts, env, failures=0, stall=0):
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    server.issues = server.requests = 0
+    server.failures, server.stall = failures, stall
+    latencies = []
+    start = time.time()
+    for i in range(alerts):
+        alert = json.loads(payload(url, i, '0'))
+        alert['configuration']['timeout'] = '1'
+        begin = time.time()
+        execute(json.dumps(alert), env).wait()
+        latencies.append(time.time() - begin)
+    while server.issues < alerts and time.time() - start < 300:
+        time.sleep(0.05)
+    latencies.sort()
+    print '%-8s %3d alerts  median %5.2fs  max %5.2fs  (%d tickets opened after %.1fs, %d requests)' % (
+        name, alerts, latencies[len(latencies) // 2], latencies[-1], server.issues,
+        time.time() - start, server.requests)
+
+
+if __name__ == '__main__':
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    server = StubJira(0.01)
+    server.RequestHandlerClass = FlakyJiraHandler
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    splunk_home = tempfile.mkdtemp()
+    env = dict(os.environ, SPLUNK_HOME=splunk_home)
+    try:
+        run('healthy', server, alerts, env)
+        run('stalled', server, alerts, env, failures=alerts, stall=5)
+        run('failing', server, alerts, env, failures=alerts * 2)
+    finally:
+        try:
+            with open(os.path.join(splunk_home, 'var', 'spool', 'jira_alerts', 'dispatcher.lock')) as f:
+                os.kill(int(f.read()), signal.SIGTERM)
+        except (IOError, OSError, ValueError):
+            pass
+        shutil.rmtree(splunk_home, ignore_errors=True)
@@ -0,0 +1,65 @@
+"""Checks and times prefix lookups on splunklib.data.Record.
+
+Builds a record shaped like a saved search, with dotted keys such as
+action.jira.param.summary, and checks that prefix lookups return the nested
+records the dotted keys describe, including after a nested record is
+changed at each depth. Then reports how long repeated prefix lookups take.
+
+Usage: python record_prefixes.py [lookups]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+from splunklib import data
+
+
+def saved_search():
+    keys = {'search': 'tag=keycard', 'cron_schedule': '*/1 * * * *'}
+    for action in ('email', 'jira', 'script', 'rss', 'summary_index'):
+        for param in ('summary', 'description', 'to', 'format', 'ttl'):
+            keys['action.%s.param.%s' % (action, param)] = '%s %s' % (action, param)
+    for i in range(50):
+        keys['dispatch.setting%d' % i] = str(i)
+    return data.record(keys)
+
+
+def check():
+    r = saved_search()
+    assert r.action.jira.param.summary == 'jira summary'
+    assert r['action.jira.param'].to == 'jira to'
+
+    # A change made through a nested record stays in that record, and the
+    # next lookup is built again from the dotted keys.
+    r.action.jira.param.summary = 'CHANGED'
+    assert r.action.jira.param.summary == 'jira summary'
+    assert dict.__getitem__(r, 'action.jira.param.summary') == 'jira summary'
+
+    r.action.email.param.to = 'CHANGED'
+    assert r.action.email.param.to == 'email to'
+    r.dispatch.setting1 = 'CHANGED'
+    assert r.dispatch.setting1 == '1'
+
+    # Changing a dotted key is seen by the next lookup
+    r['action.jira.param.summary'] = 'new summary'
+    assert r.action.jira.param.summary == 'new summary'
+    print 'checks passed'
+
+
+def run(lookups):
+    r = saved_search()
+    start = time.time()
+    for i in xrange(lookups):
+        r.action.jira.param.summary
+    elapsed = time.time() - start
+    print '%d lookups of action.jira.param.summary %.2fs %10.0f lookups/s' % (
+        lookups, elapsed, lookups / elapsed)
+
+
+if __name__ == '__main__':
+    check()
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
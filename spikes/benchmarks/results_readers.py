@@ -0,0 +1,63 @@
+"""Compares the XML, JSON and CSV search results readers in splunklib.results.
+
+Generates the same synthetic result set in each output mode and times how
+long each reader takes to iterate over it.
+
+Usage: python results_readers.py [rows] [fields]
+"""
+
+import os
+import sys
+import time
+import json
+
+from StringIO import StringIO
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+from splunklib import results
+
+
+def make_rows(rows, fields):
+    return [dict(('field%d' % f, 'value %d-%d' % (r, f)) for f in range(fields))
+            for r in range(rows)]
+
+def to_xml(data):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n<results preview="0">\n']
+    for row in data:
+        out.append('<result>')
+        for key, value in row.iteritems():
+            out.append('<field k="%s"><value><text>%s</text></value></field>' % (key, escape(value)))
+        out.append('</result>\n')
+    out.append('</results>\n')
+    return ''.join(out)
+
+def to_json(data):
+    return json.dumps({'preview': False, 'init_offset': 0, 'messages': [], 'results': data})
+
+def to_csv(data):
+    header = sorted(data[0].keys())
+    out = [','.join(header) + '\n']
+    for row in data:
+        out.append(','.join('"%s"' % row[key] for key in header) + '\n')
+    return ''.join(out)
+
+def run(name, reader_class, payload):
+    start = time.time()
+    count = 0
+    for result in reader_class(StringIO(payload)):
+        count += 1
+    elapsed = time.time() - start
+    print '%-5s %8d rows %8.3fs %10.0f rows/s' % (name, count, elapsed, count / elapsed)
+    return elapsed
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fields = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    data = make_rows(rows, fields)
+    xml_time = run('xml', results.ResultsReader, to_xml(data))
+    json_time = run('json', results.JSONResultsReader, to_json(data))
+    csv_time = run('csv', results.CSVResultsReader, to_csv(data))
+    print 'json speedup: %.1fx, csv speedup: %.1fx' % (xml_time / json_time, xml_time / csv_time)
@@ -0,0 +1,63 @@
+"""Compares StreamingCommand.stream and StreamingCommand.stream_batches.
+
+Runs the same enrichment, a per-record arithmetic transform of one field,
+through a record-at-a-time command and a batched command over a legacy
+__EXECUTE__ request and reports how many records per second each one manages.
+
+Usage: python streaming_batches.py [records]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from cStringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'googledrive_addon', 'bin'))
+
+# splunklib.searchcommands reads SPLUNK_HOME when it is imported
+os.environ.setdefault('SPLUNK_HOME', tempfile.gettempdir())
+
+from splunklib.searchcommands import Configuration, StreamingCommand
+
+
+@Configuration()
+class PerRecord(StreamingCommand):
+    def stream(self, records):
+        for record in records:
+            record['bytes_kb'] = int(record['bytes']) / 1024.0
+            yield record
+
+
+@Configuration()
+class PerBatch(StreamingCommand):
+    def stream_batches(self, batches):
+        for batch in batches:
+            batch['bytes_kb'] = [int(value) / 1024.0 for value in batch['bytes']]
+            yield batch
+
+
+def make_input(records):
+    lines = ['\n', '_time,user,src,bytes,action\r\n']
+    for i in xrange(records):
+        lines.append('%d,user%d@example.com,10.0.%d.%d,%d,view\r\n' % (
+            1420070400 + i, i % 500, i % 256, i % 200, i * 37 % 100000))
+    return ''.join(lines)
+
+
+def run(name, command_class, data, records):
+    with open(os.devnull, 'w') as output:
+        start = time.time()
+        command_class().process(['bench.py', '__EXECUTE__'], StringIO(data), output)
+        elapsed = time.time() - start
+    print '%-10s %8d records %8.3fs %10.0f records/s' % (name, records, elapsed, records / elapsed)
+    return elapsed
+
+if __name__ == '__main__':
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = make_input(records)
+    record_time = run('stream', PerRecord, data, records)
+    batch_time = run('batches', PerBatch, data, records)
+    print 'speedup: %.1fx' % (record_time / batch_time)
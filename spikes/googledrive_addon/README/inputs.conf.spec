@@ -1,2 +1,15 @@
 [googledrive://<name>]
-description = <string>
\ No newline at end of file
+description = <string>
+backfill = <bool>
+* Fetch windows longer than backfill_slice as concurrent sub-windows,
+  written to Splunk in time order. Defaults to false.
+
+backfill_slice = <integer>
+* Length of a backfill sub-window in seconds. Defaults to 3600.
+
+backfill_threads = <integer>
+* Maximum number of sub-windows fetched at once. Defaults to 4.
+
+backfill_retries = <integer>
+* Number of times a failed sub-window is retried, with exponential
+  backoff, before the run gives up. Defaults to 3.
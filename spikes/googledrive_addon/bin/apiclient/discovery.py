@@ -49,6 +49,7 @@ import mimeparse
 import uritemplate
 
 # Local imports
+from apiclient.discovery_cache import file_cache
 from apiclient.errors import HttpError
 from apiclient.errors import InvalidJsonError
 from apiclient.errors import MediaUploadSizeError
@@ -146,7 +147,9 @@ def build(serviceName,
           discoveryServiceUrl=DISCOVERY_URI,
           developerKey=None,
           model=None,
-          requestBuilder=HttpRequest):
+          requestBuilder=HttpRequest,
+          cache_discovery=True,
+          cache=None):
   """Construct a Resource for interacting with an API.
 
   Construct a Resource object for interacting with an API. The serviceName and
@@ -166,6 +169,11 @@ def build(serviceName,
     model: apiclient.Model, converts to and from the wire format.
     requestBuilder: apiclient.http.HttpRequest, encapsulator for an HTTP
       request.
+    cache_discovery: Boolean, whether or not to cache the discovery document.
+    cache: apiclient.discovery_cache.FileCache, or any object with the same
+      get() and set() methods, to store discovery documents in. Defaults to
+      a cache shared by the whole process, in a private directory under the
+      user's home directory.
 
   Returns:
     A Resource object with methods for interacting with the service.
@@ -188,15 +196,45 @@ def build(serviceName,
     requested_url = _add_query_parameter(requested_url, 'userIp',
                                          os.environ['REMOTE_ADDR'])
 
-  logger.info('URL being requested: %s' % requested_url)
+  content = _retrieve_discovery_doc(requested_url, http, serviceName, version,
+                                    cache_discovery, cache)
 
-  resp, content = http.request(requested_url)
+  return build_from_document(content, base=discoveryServiceUrl, http=http,
+      developerKey=developerKey, model=model, requestBuilder=requestBuilder)
+
+
+def _retrieve_discovery_doc(url, http, serviceName, version, cache_discovery,
+                            cache=None):
+  """Retrieves the discovery document for an API.
+
+  Args:
+    url: string, the URL of the discovery document.
+    http: httplib2.Http, the Http object to fetch the document with.
+    serviceName: string, name of the service.
+    version: string, the version of the service.
+    cache_discovery: Boolean, whether or not to use the discovery cache.
+    cache: apiclient.discovery_cache.FileCache, the cache to use, or None for
+      the default cache.
+
+  Returns:
+    The discovery document as a JSON string.
+  """
+  if cache_discovery:
+    if cache is None:
+      cache = file_cache()
+    content = cache.get(url)
+    if content:
+      return content
+
+  logger.info('URL being requested: %s' % url)
+
+  resp, content = http.request(url)
 
   if resp.status == 404:
     raise UnknownApiNameOrVersion("name: %s  version: %s" % (serviceName,
                                                             version))
   if resp.status >= 400:
-    raise HttpError(resp, content, uri=requested_url)
+    raise HttpError(resp, content, uri=url)
 
   try:
     service = simplejson.loads(content)
@@ -204,8 +242,9 @@ def build(serviceName,
     logger.error('Failed to parse as JSON: ' + content)
     raise InvalidJsonError()
 
-  return build_from_document(content, base=discoveryServiceUrl, http=http,
-      developerKey=developerKey, model=model, requestBuilder=requestBuilder)
+  if cache_discovery:
+    cache.set(url, content)
+  return content
 
 
 @positional(1)
@@ -0,0 +1,186 @@
+# Copyright (C) 2014 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Caching for discovery documents.
+
+Discovery documents change rarely, so build() keeps a copy of each one it
+fetches and reuses it until it expires instead of requesting it again.
+"""
+
+__all__ = [
+    'DISCOVERY_DOC_MAX_AGE',
+    'FileCache',
+    'file_cache',
+    ]
+
+
+import errno
+import hashlib
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+
+import apiclient
+from oauth2client.anyjson import simplejson
+
+
+logger = logging.getLogger(__name__)
+
+# How long a cached discovery document is used before it is fetched again.
+DISCOVERY_DOC_MAX_AGE = 60 * 60 * 24
+
+# Stored with every entry; entries written by a different version of the
+# library are ignored, since they may be built differently.
+CACHE_VERSION = apiclient.__version__
+
+# Discovery documents say where requests, and the credentials that go with
+# them, are sent, so they are only read from a directory no one else can
+# write to.
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache',
+                                       'apiclient-discovery')
+
+
+def _owned(st):
+  if not hasattr(os, 'getuid'):
+    return True
+  return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP |
+                                                         stat.S_IWOTH)
+
+
+class FileCache(object):
+  """A discovery document cache backed by a directory of JSON files.
+
+  Each document is stored in its own file, named after a hash of the URL it
+  was retrieved from, which encodes the API name and version. Documents read
+  from disk are also kept in memory for the life of the process.
+
+  The directory is created with mode 0700. The cache is not used if the
+  directory, or a file in it, belongs to another user or can be written by
+  others.
+  """
+
+  def __init__(self, directory=DEFAULT_CACHE_DIRECTORY,
+               max_age=DISCOVERY_DOC_MAX_AGE):
+    """Constructor for FileCache.
+
+    Args:
+      directory: string, directory the documents are stored in. It is created
+        if it does not exist.
+      max_age: int, number of seconds a document stays fresh.
+    """
+    self._directory = directory
+    self._max_age = max_age
+    self._memory = {}
+    self._lock = threading.Lock()
+
+  def _usable_directory(self):
+    try:
+      os.makedirs(self._directory, 0700)
+    except OSError, e:
+      if e.errno != errno.EEXIST:
+        logger.warning('Failed to create discovery cache %s: %s' %
+                       (self._directory, e))
+        return False
+    st = os.lstat(self._directory)
+    if not stat.S_ISDIR(st.st_mode) or not _owned(st):
+      logger.warning('Not using discovery cache %s, which is not a private '
+                     'directory of this user' % self._directory)
+      return False
+    return True
+
+  def _path(self, url):
+    return os.path.join(self._directory, hashlib.md5(url).hexdigest() + '.json')
+
+  def _fresh(self, entry):
+    return (entry.get('version') == CACHE_VERSION and
+            time.time() - entry.get('timestamp', 0) < self._max_age)
+
+  def get(self, url):
+    """Gets the discovery document for a URL.
+
+    Args:
+      url: string, the URL the document was retrieved from.
+
+    Returns:
+      The document as a JSON string, or None if it is not cached or has
+      expired.
+    """
+    with self._lock:
+      entry = self._memory.get(url)
+    if entry is None:
+      if not self._usable_directory():
+        return None
+      try:
+        with open(self._path(url), 'r') as f:
+          if not _owned(os.fstat(f.fileno())):
+            return None
+          entry = simplejson.load(f)
+      except (IOError, ValueError):
+        return None
+      if entry.get('url') != url:
+        return None
+      with self._lock:
+        self._memory[url] = entry
+    if not self._fresh(entry):
+      return None
+    return entry['content']
+
+  def set(self, url, content):
+    """Stores the discovery document for a URL.
+
+    Failures to write are logged and otherwise ignored, since the cache is
+    only an optimization.
+
+    Args:
+      url: string, the URL the document was retrieved from.
+      content: string, the document as a JSON string.
+    """
+    entry = {
+        'version': CACHE_VERSION,
+        'url': url,
+        'timestamp': time.time(),
+        'content': content,
+        }
+    with self._lock:
+      self._memory[url] = entry
+    path = self._path(url)
+    if not self._usable_directory():
+      return
+    try:
+      # Write to a temporary file and rename it into place so concurrent
+      # readers never see a partially written document.
+      fd, temp_path = tempfile.mkstemp(dir=self._directory)
+      with os.fdopen(fd, 'w') as f:
+        simplejson.dump(entry, f)
+      if os.name == 'nt' and os.path.exists(path):
+        os.remove(path)
+      os.rename(temp_path, path)
+    except (IOError, OSError), e:
+      logger.warning('Failed to cache discovery document %s: %s' % (url, e))
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def file_cache():
+  """Returns the FileCache shared by every call to build() in this process."""
+  global _default_cache
+  with _default_cache_lock:
+    if _default_cache is None:
+      _default_cache = FileCache()
+    return _default_cache
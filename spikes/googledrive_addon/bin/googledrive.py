@@ -1,5 +1,9 @@
 import sys
 import os
+import json
+import hashlib
+import threading
+import Queue
 
 from splunklib.modularinput import *
 
@@ -9,7 +13,9 @@ import httplib2
 
 from apiclient import errors
 from apiclient.discovery import build
+from apiclient.discovery_cache import FileCache
 from datetime import datetime, timedelta
+from time import sleep
 from oauth2client.file import Storage
 from oauth2client.client import OAuth2WebServerFlow
 from splunk.appserver.mrsparkle.lib.util import make_splunkhome_path
@@ -33,7 +39,195 @@ def setup_logger():
 
 logger = setup_logger()
 
+# Discovery documents are cached next to the checkpoints, where only
+# splunkd's user can write.
+discovery_cache = FileCache(make_splunkhome_path(['var', 'lib', 'splunk', 'modinputs',
+                                                  'googledrive', 'discovery_cache']))
+
+def checkpoint_path(checkpoint_dir, input_name):
+    # Stanza names look like googledrive://pas, so hash them into a
+    # file name that is safe on every platform.
+    return os.path.join(checkpoint_dir, hashlib.md5(input_name).hexdigest())
+
+def load_checkpoint(path):
+    # Returns the last emitted id.time and the uniqueQualifiers seen at
+    # that time, or None if this stanza has never run.
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            checkpoint = json.load(f)
+        return checkpoint['time'], set(checkpoint['uniqueQualifiers'])
+    except Exception, e:
+        logger.exception(e)
+        return None
+
+def save_checkpoint(path, time, unique_qualifiers):
+    # Write to a temporary file and rename it into place, so a crash
+    # half-way through never leaves a truncated checkpoint behind.
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'time': time, 'uniqueQualifiers': list(unique_qualifiers)}, f)
+    # rename replaces the old checkpoint atomically on POSIX; only Windows
+    # refuses to rename over an existing file.
+    if os.name == 'nt' and os.path.exists(path):
+        os.remove(path)
+    os.rename(temp_path, path)
+
+def activity_pages(reports_service, params):
+    # Yields the items of each page of activities().list() as it arrives,
+    # following nextPageToken until the last page.
+    params = dict(params)
+    while True:
+        current_page = reports_service.activities().list(**params).execute()
+        yield current_page.get('items', [])
+        page_token = current_page.get('nextPageToken')
+        if not page_token:
+            break
+        params['pageToken'] = page_token
+
+def activity_events(activity, input_name):
+    # Yields one Event per event of a Reports API activity.
+    time = activity["id"]["time"]
+    email = activity["actor"]["email"]
+    ip_address = activity.get("ipAddress")
+    for event in activity["events"]:
+        logger.debug("Parsing activity events!")
+        event_type = event["type"]
+        event_name = event["name"]
+        parameters = ""
+        for parameter in event["parameters"]:
+            value = parameter.get("value")
+            if value == None:
+                value = parameter.get("boolValue")
+            parameters += '%s="%s" ' % (parameter["name"], value)
+        raw_event = Event()
+        raw_event.stanza = input_name
+        raw_event.data = '%s email=%s src=%s type=%s event=%s %s' % (time,email,ip_address,event_type,event_name,parameters)
+        yield raw_event
+
+def is_true(value):
+    return str(value).strip().lower() in ('1', 'true', 't', 'yes', 'y')
+
+def rfc3339(dt):
+    # Formats a naive UTC datetime the way the Reports API reports id.time.
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (dt.microsecond // 1000)
+
+def parse_rfc3339(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ')
+
+def time_slices(begin, end, slice_seconds):
+    # Splits [begin, end) into consecutive sub-windows of slice_seconds.
+    # endTime is inclusive in the Reports API, so each slice stops one
+    # millisecond short of the next one to avoid fetching boundaries twice.
+    slices = []
+    step = timedelta(seconds=slice_seconds)
+    slice_start = begin
+    while slice_start < end:
+        slice_end = min(slice_start + step, end)
+        slices.append((rfc3339(slice_start), rfc3339(slice_end - timedelta(milliseconds=1))))
+        slice_start = slice_end
+    return slices
+
+def fetch_slice(reports_service, params, retries):
+    # Returns every activity in one slice, oldest first, retrying the
+    # whole slice with exponential backoff if any page fails.
+    attempt = 0
+    while True:
+        try:
+            activities = []
+            for page in activity_pages(reports_service, params):
+                activities.extend(page)
+            activities.reverse()
+            return activities
+        except Exception, e:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            logger.warning("Retrying slice %s - %s (attempt %d): %s" % (params['startTime'], params['endTime'], attempt, e))
+            sleep(2 ** attempt)
+
+def backfill_activities(make_service, params, slices, threads, retries):
+    # Fetches the slices concurrently on a bounded pool of worker threads
+    # and yields their activities in ascending time order. At most
+    # 'threads' slices are fetched ahead of the one being written, so
+    # memory stays bounded no matter how long the backfill window is.
+    tasks = Queue.Queue()
+    results = {}
+    finished = threading.Condition()
+
+    def worker():
+        # httplib2.Http is not thread-safe, so each worker builds its own
+        # authorized service.
+        try:
+            reports_service, service_error = make_service(), None
+        except Exception, e:
+            reports_service, service_error = None, e
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, (slice_start, slice_end) = task
+            # Whatever happens, the slice gets a result, so the consumer
+            # never waits on a slice no worker is fetching any more.
+            result = (None, service_error or RuntimeError("Worker stopped fetching slice %s - %s" % (slice_start, slice_end)))
+            try:
+                if reports_service is not None:
+                    slice_params = dict(params, startTime=slice_start, endTime=slice_end)
+                    result = (fetch_slice(reports_service, slice_params, retries), None)
+            except Exception, e:
+                result = (None, e)
+            finally:
+                with finished:
+                    results[index] = result
+                    finished.notify_all()
+
+    workers = [threading.Thread(target=worker) for _ in range(min(threads, len(slices)))]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    try:
+        for index in range(min(threads, len(slices))):
+            tasks.put((index, slices[index]))
+        for index in range(len(slices)):
+            with finished:
+                while index not in results:
+                    if not any(thread.is_alive() for thread in workers):
+                        raise RuntimeError("Backfill workers stopped before slice %s - %s" % slices[index])
+                    finished.wait(1)
+                activities, error = results.pop(index)
+            if error is not None:
+                raise error
+            if index + threads < len(slices):
+                tasks.put((index + threads, slices[index + threads]))
+            logger.debug("Writing slice %s - %s" % slices[index])
+            for activity in activities:
+                yield activity
+    finally:
+        for thread in workers:
+            tasks.put(None)
+
+def build_reports_service(credentials):
+    # Create an httplib2.Http object and authorize it with our credentials
+    http = httplib2.Http()
+
+    #TODO: Fix cert validation
+    http.disable_ssl_certificate_validation = True
+    http = credentials.authorize(http)
+    return build('admin', 'reports_v1', http=http, cache=discovery_cache)
+
 class MyScript(Script):
+    def run(self, args):
+        # Events are written in batches rather than one at a time.
+        ew = BufferedEventWriter()
+        try:
+            return self.run_script(args, ew, sys.stdin)
+        finally:
+            # run_script only closes the writer when stream_events returns,
+            # so events buffered before an input failed are written here.
+            if ew.header_written:
+                ew.close()
+
     def get_scheme(self):
         # Setup scheme.
         scheme = Scheme("Google Drive Activity Stream")
@@ -47,6 +241,30 @@ class MyScript(Script):
         description_argument.required_on_create = False
         scheme.add_argument(description_argument)
 
+        backfill_argument = Argument("backfill")
+        backfill_argument.data_type = Argument.data_type_boolean
+        backfill_argument.description = "(Optional) Fetch windows longer than backfill_slice as concurrent sub-windows."
+        backfill_argument.required_on_create = False
+        scheme.add_argument(backfill_argument)
+
+        backfill_slice_argument = Argument("backfill_slice")
+        backfill_slice_argument.data_type = Argument.data_type_number
+        backfill_slice_argument.description = "(Optional) Length of a backfill sub-window in seconds. Defaults to 3600."
+        backfill_slice_argument.required_on_create = False
+        scheme.add_argument(backfill_slice_argument)
+
+        backfill_threads_argument = Argument("backfill_threads")
+        backfill_threads_argument.data_type = Argument.data_type_number
+        backfill_threads_argument.description = "(Optional) Maximum number of sub-windows fetched at once. Defaults to 4."
+        backfill_threads_argument.required_on_create = False
+        scheme.add_argument(backfill_threads_argument)
+
+        backfill_retries_argument = Argument("backfill_retries")
+        backfill_retries_argument.data_type = Argument.data_type_number
+        backfill_retries_argument.description = "(Optional) Number of times a failed sub-window is retried. Defaults to 3."
+        backfill_retries_argument.required_on_create = False
+        scheme.add_argument(backfill_retries_argument)
+
         return scheme
 
     def stream_events(self, inputs, ew):
@@ -70,14 +288,8 @@ class MyScript(Script):
             storage = Storage(credentials_path)
             credentials = storage.get()
 
-            # Create an httplib2.Http object and authorize it with our credentials
-            http = httplib2.Http()
-
-            #TODO: Fix cert validation
-            http.disable_ssl_certificate_validation = True
-            http = credentials.authorize(http)
+            reports_service = build_reports_service(credentials)
             logger.debug("Credentials validated successfully!")
-            reports_service = build('admin', 'reports_v1', http=http)
 
             dtnow = datetime.now()
             dtutcnow = datetime.utcnow()
@@ -86,48 +298,81 @@ class MyScript(Script):
             timezone = "%+03d:%02d" % (hh, mm)
 
             now = datetime.now().replace(second=0, microsecond=0)
-            begin = now - timedelta(seconds=int(INTERVAL))
-            start_time = begin.isoformat('T') + timezone
             end_time = now.isoformat('T') + timezone
+
+            # Resume from the high-water mark of the previous run. The
+            # Reports API treats startTime as inclusive, so activities at
+            # exactly that time are filtered by uniqueQualifier below.
+            checkpoint_file = checkpoint_path(inputs.metadata["checkpoint_dir"], input_name)
+            checkpoint = load_checkpoint(checkpoint_file)
+            if checkpoint:
+                last_time, last_qualifiers = checkpoint
+                start_time = first_time = last_time
+            else:
+                last_time, last_qualifiers = None, set()
+                begin = now - timedelta(seconds=int(INTERVAL))
+                start_time = begin.isoformat('T') + timezone
+                first_time = rfc3339(begin - timedelta(minutes=hh * 60 + mm))
             logger.debug("Start Time: " + start_time + ", End Time: " + end_time)
 
-            activity_stream = []
-            page_token = None
+            fetch_complete = True
             params = {'applicationName': 'drive', 'userKey': 'all', 'startTime': start_time, 'endTime' : end_time}
-            while True:
-                try:
-                    if page_token:
-                        param['pageToken'] = page_token
-                    current_page = reports_service.activities().list(**params).execute()
-                    if current_page.get('items'):
-                        activity_stream.extend(current_page['items'])
-                    page_token = current_page.get('nextPageToken')
-                    if not page_token:
-                        break
-                except Exception, e:
-                    logger.exception(e)
-                    break
-
-            for activity in activity_stream:
-                logger.debug("Parsing activities!")
-                time = activity["id"]["time"]
-                email = activity["actor"]["email"]
-                ip_address = activity.get("ipAddress")
-                for event in activity["events"]:
-                    logger.debug("Parsing activity events!")
-                    event_type = event["type"]
-                    event_name = event["name"]
-                    parameters = ""
-                    for parameter in event["parameters"]:
-                        value = parameter.get("value")
-                        if value == None:
-                            value = parameter.get("boolValue")
-                        parameters += '%s="%s" ' % (parameter["name"], value)
-                    raw_event = Event()
-                    raw_event.stanza = input_name
-                    raw_event.data = '%s email=%s src=%s type=%s event=%s %s' % (time,email,ip_address,event_type,event_name,parameters)
-                    ew.write_event(raw_event)
-                    
+
+            # In backfill mode a long window is split into sub-windows that
+            # are fetched concurrently and written oldest first.
+            slices = []
+            if is_true(input_item.get("backfill", False)):
+                window_end = datetime.utcnow().replace(second=0, microsecond=0)
+                window_start = parse_rfc3339(first_time)
+                slices = time_slices(window_start, window_end, int(input_item.get("backfill_slice", 3600)))
+            if len(slices) > 1:
+                threads = int(input_item.get("backfill_threads", 4))
+                retries = int(input_item.get("backfill_retries", 3))
+                logger.debug("Backfilling %d slices with %d threads" % (len(slices), threads))
+                pages = [backfill_activities(lambda: build_reports_service(credentials),
+                                             params, slices, threads, retries)]
+            else:
+                pages = activity_pages(reports_service, params)
+
+            # id.time is always RFC 3339 in UTC with millisecond precision,
+            # so timestamps compare correctly as strings.
+            # A first run that finds no activities still checkpoints the
+            # start of its window, so the next run picks up from there.
+            high_time, high_qualifiers = first_time, set(last_qualifiers)
+            try:
+                # Each page is written out before the next one is
+                # requested, so only one page is held in memory at a time.
+                for page in pages:
+                    for activity in page:
+                        logger.debug("Parsing activities!")
+                        time = activity["id"]["time"]
+                        unique_qualifier = activity["id"].get("uniqueQualifier")
+                        if last_time is not None:
+                            if time < last_time or (time == last_time and unique_qualifier in last_qualifiers):
+                                logger.debug("Skipping activity already emitted: %s %s" % (time, unique_qualifier))
+                                continue
+                        if high_time is None or time > high_time:
+                            high_time, high_qualifiers = time, set([unique_qualifier])
+                        elif time == high_time:
+                            high_qualifiers.add(unique_qualifier)
+
+                        for raw_event in activity_events(activity, input_name):
+                            ew.write_event(raw_event)
+            except Exception, e:
+                logger.exception(e)
+                fetch_complete = False
+
+            # Pages come back newest first, so a failed fetch may have
+            # skipped older activities; keep the old checkpoint and retry.
+            # Backfills are written oldest first, so whatever they wrote
+            # before failing is safe to checkpoint.
+            if (fetch_complete or len(slices) > 1) and high_time is not None:
+                # The checkpoint must not get ahead of what Splunk has
+                # received.
+                ew.flush()
+                save_checkpoint(checkpoint_file, high_time, high_qualifiers)
+                logger.debug("Saved checkpoint for %s at %s" % (input_name, high_time))
+
         logger.debug("Finished processing!")
 
 if __name__ == "__main__":
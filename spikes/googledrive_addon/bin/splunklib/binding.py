@@ -24,11 +24,19 @@ If you want a friendlier interface to the Splunk REST API, use the
 :mod:`splunklib.client` module.
 """
 
+import errno
+import hashlib
 import httplib
+import json
 import logging
+import os
 import socket
 import ssl
+import threading
+import tempfile
+import time
 import urllib
+import zlib
 
 from datetime import datetime
 from functools import wraps
@@ -45,7 +53,10 @@ __all__ = [
     "connect",
     "Context",
     "handler",
-    "HTTPError"
+    "HTTPError",
+    "MetricsRecorder",
+    "pooled_handler",
+    "SessionCache"
 ]
 
 # If you change these, update the docstring
@@ -236,16 +247,25 @@ def _authentication(request_fun):
             # Issue the request
             return request_fun(self, *args, **kwargs)
         except HTTPError as he:
-            if he.status == 401 and self.autologin:
+            if he.status == 401 and (self.autologin or self._token_cached):
                 # Authentication failed. Try logging in, and then
                 # rerunning the request. If either step fails, throw
-                # an AuthenticationError and give up.
+                # an AuthenticationError and give up. A token from the
+                # session cache may have died with a restart of the
+                # server, so it is dropped from the cache and replaced
+                # even without autologin.
+                if self._token_cached:
+                    self._discard_cached_token()
                 with _handle_auth_error("Autologin failed."):
                     self.login()
                 with _handle_auth_error(
                         "Autologin succeeded, but there was an auth error on "
                         "next request. Something is very wrong."):
-                    return request_fun(self, *args, **kwargs)
+                    _request_state.auth_refreshes = 1
+                    try:
+                        return request_fun(self, *args, **kwargs)
+                    finally:
+                        _request_state.auth_refreshes = 0
             elif he.status == 401 and not self.autologin:
                 raise AuthenticationError(
                     "Request failed: Session is not logged in.", he)
@@ -392,6 +412,12 @@ class Context(object):
     :param password: The password for the Splunk account.
     :type password: ``string``
     :param handler: The HTTP request handler (optional).
+    :param metrics: A function called with a record describing each request
+        (optional). See :class:`HttpLib` for its fields, and
+        :class:`MetricsRecorder` for a ready-made one.
+    :param session_cache: A cache of session tokens shared with other
+        processes, which :meth:`login` consults before logging in (optional).
+    :type session_cache: :class:`SessionCache`
     :returns: A ``Context`` instance.
 
     **Example**::
@@ -404,8 +430,8 @@ class Context(object):
         # Of if you already have a session token
         c = binding.Context(token="atg232342aa34324a")
     """
-    def __init__(self, handler=None, **kwargs):
-        self.http = HttpLib(handler)
+    def __init__(self, handler=None, metrics=None, **kwargs):
+        self.http = HttpLib(handler, metrics)
         self.token = kwargs.get("token", _NoAuthenticationToken)
         if self.token is None: # In case someone explicitly passes token=None
             self.token = _NoAuthenticationToken
@@ -417,6 +443,9 @@ class Context(object):
         self.username = kwargs.get("username", "")
         self.password = kwargs.get("password", "")
         self.autologin = kwargs.get("autologin", False)
+        self.session_cache = kwargs.get("session_cache")
+        # Whether self.token came from the session cache
+        self._token_cached = False
 
     # Shared per-context request headers
     @property
@@ -737,6 +766,11 @@ class Context(object):
         The authentication token obtained from the server is stored in the
         ``token`` field of the ``Context`` object.
 
+        If the ``Context`` has a :class:`SessionCache`, a session token
+        cached by this or another process for the same server and credentials
+        is used instead, without a round trip. Otherwise the new token is
+        cached once logged in.
+
         :raises AuthenticationError: Raised when login fails.
         :returns: The ``Context`` object, so you can chain calls.
 
@@ -752,6 +786,32 @@ class Context(object):
             # password, then login is a nop, since we're automatically
             # logged in.
             return
+        if self.session_cache is None or not self.username:
+            return self._login()
+        key = self.session_cache.key(self.authority, self.username, self.password)
+        # A cached token equal to ours is the one that just stopped working.
+        token = self.session_cache.get(key)
+        if token is not None and token != self.token:
+            self.token = token
+            self._token_cached = True
+            return self
+        with self.session_cache.lock():
+            # Another process may have logged in while we waited.
+            token = self.session_cache.get(key)
+            if token is not None and token != self.token:
+                self.token = token
+                self._token_cached = True
+                return self
+            self._login()
+            self.session_cache.set(key, self.token)
+        return self
+
+    def _discard_cached_token(self):
+        key = self.session_cache.key(self.authority, self.username, self.password)
+        self.session_cache.discard(key, self.token)
+        self._token_cached = False
+
+    def _login(self):
         try:
             response = self.http.post(
                 self.authority + self._abspath("/services/auth/login"),
@@ -760,6 +820,7 @@ class Context(object):
             body = response.body.read()
             session = XML(body).findtext("./sessionKey")
             self.token = "Splunk %s" % session
+            self._token_cached = False
             return self
         except HTTPError as he:
             if he.status == 401:
@@ -770,6 +831,7 @@ class Context(object):
     def logout(self):
         """Forgets the current session token."""
         self.token = _NoAuthenticationToken
+        self._token_cached = False
         return self
 
     def _abspath(self, path_segment,
@@ -834,6 +896,159 @@ class Context(object):
         return path
 
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class SessionCache(object):
+    """A cache of session tokens in a file, shared by processes that connect
+    to the same Splunk instances.
+
+    Scripts that run briefly and often, such as alert actions and modular
+    inputs, spend much of their time logging in. Given a ``SessionCache``,
+    :meth:`Context.login` (and so :func:`connect` and
+    :func:`splunklib.client.connect`) reuses a token cached by an earlier run
+    for the same server, username, and password, and caches the token it gets
+    when it does log in. Logins are serialized with a lock file, so processes
+    that start together log in once between them.
+
+    Tokens are used for *ttl* seconds after the login that created them, less
+    *refresh_margin* seconds, after which the next :meth:`Context.login` logs
+    in again instead of using a token that is about to expire. Match *ttl* to
+    the session timeout of the server (one hour by default).
+
+    A token that the server rejects, for instance because it was restarted,
+    is removed from the cache, and the ``Context`` logs in again, whether or
+    not it has ``autologin`` set.
+
+    The cache file holds live session tokens. It and its lock file are
+    created readable and writable by their owner only, in a directory only
+    the owner can use, created if it does not exist. Entries are keyed by a
+    hash of the server and credentials, so the credentials themselves are
+    not stored.
+
+    :param path: The path of the cache file (the default is
+        ``~/.cache/splunklib/sessions.json``).
+    :type path: ``string``
+    :param ttl: The number of seconds a session lasts.
+    :type ttl: ``integer``
+    :param refresh_margin: The number of seconds before a session expires that
+        it stops being used.
+    :type refresh_margin: ``integer``
+
+    **Example**::
+
+        import splunklib.binding as binding
+        import splunklib.client as client
+        cache = binding.SessionCache()
+        s = client.connect(host="localhost", username="admin",
+                           password="changeme", session_cache=cache)
+    """
+    def __init__(self, path=None, ttl=3600, refresh_margin=300):
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".cache", "splunklib",
+                                "sessions.json")
+        self.path = path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+
+    @staticmethod
+    def key(authority, username, password):
+        """Returns the key of the token for a server and credentials."""
+        return hashlib.sha256("\0".join((authority, username, password))).hexdigest()
+
+    def get(self, key):
+        """Returns the cached token for *key*, or ``None`` if there is none or
+        it is due to be refreshed."""
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.get("created", 0) >= self.ttl - self.refresh_margin:
+            return None
+        return entry.get("token")
+
+    def set(self, key, token):
+        """Caches *token* for *key*.
+
+        Failures to write are logged and otherwise ignored, since the cache is
+        only an optimization. Call it while holding :meth:`lock`, so that
+        concurrent writers do not drop each other's entries.
+        """
+        now = time.time()
+        entries = dict((k, entry) for k, entry in self._read().iteritems()
+                       if now - entry.get("created", 0) < self.ttl)
+        entries[key] = {"token": token, "created": now}
+        self._write(entries)
+
+    def discard(self, key, token):
+        """Removes the cached token for *key*, if it is *token*, so that no
+        process uses it again."""
+        with self.lock():
+            entries = self._read()
+            if entries.get(key, {}).get("token") == token:
+                del entries[key]
+                self._write(entries)
+
+    def _write(self, entries):
+        try:
+            self._make_directory()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            # mkstemp creates the file readable and writable by its owner only.
+            fd, temp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            if os.name == "nt" and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError) as e:
+            logging.warning("Failed to cache session token in %s: %s", self.path, e)
+
+    def clear(self):
+        """Removes every cached token."""
+        with self.lock():
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+    @contextmanager
+    def lock(self):
+        """Holds an exclusive lock on the cache, across processes."""
+        self._make_directory()
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            # Closing the file releases the lock.
+            os.close(fd)
+
+    def _make_directory(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, 0700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _read(self):
+        # The file is replaced with a rename, so it can be read without the
+        # lock.
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+
 def connect(**kwargs):
     """This function returns an authenticated :class:`Context` object.
 
@@ -864,6 +1079,9 @@ def connect(**kwargs):
     :param autologin: When ``True``, automatically tries to log in again if the
         session terminates.
     :type autologin: ``Boolean``
+    :param session_cache: A cache of session tokens to use instead of logging
+        in, when it holds one for this server and username (optional).
+    :type session_cache: :class:`SessionCache`
     :return: An initialized :class:`Context` instance.
 
     **Example**::
@@ -953,6 +1171,165 @@ def _spliturl(url):
     if port is None: port = DEFAULT_PORT
     return scheme, host, port, path
 
+# Per-thread details of the request being made, for metrics.
+_request_state = threading.local()
+
+
+def _path_template(url):
+    # Replaces the namespace and the entity name in the path of a REST URL
+    # with placeholders, so requests to the same endpoint can be grouped.
+    path = _spliturl(url)[3].split('?', 1)[0]
+    segments = [segment for segment in path.split('/') if segment]
+    if segments[:1] == ['servicesNS'] and len(segments) >= 3:
+        segments[1:3] = ['{owner}', '{app}']
+        start = 3
+    elif segments[:1] == ['services']:
+        start = 1
+    else:
+        return path
+    # Collections are two segments deep, except for inputs, which are
+    # grouped by kind.
+    depth = 3 if segments[start:start + 2] == ['data', 'inputs'] else 2
+    if len(segments) > start + depth:
+        segments[start + depth] = '{name}'
+    return '/' + '/'.join(segments)
+
+
+class _MeteredBody(object):
+    """Counts the characters read from a response body and calls *finish*
+    with the number of bytes received, before decompression, and the number
+    of characters read, once the body has been read to the end or closed.
+
+    Bodies that do not report ``bytes_received`` are taken to be received as
+    they are read.
+    """
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+        self._count = 0
+
+    def __del__(self):
+        # Bodies that are dropped unread are still reported.
+        self._done()
+
+    def __getattr__(self, name):
+        return getattr(self._body, name)
+
+    def __str__(self):
+        return self.read()
+
+    def close(self):
+        self._done()
+        self._body.close()
+
+    def read(self, size=None):
+        data = self._body.read() if size is None else self._body.read(size)
+        self._count += len(data)
+        if size is None or not data:
+            self._done()
+        return data
+
+    def _done(self):
+        finish, self._finish = self._finish, None
+        if finish is not None:
+            finish(getattr(self._body, 'bytes_received', self._count), self._count)
+
+
+class MetricsRecorder(object):
+    """Aggregates request metrics in memory, by method and path template.
+
+    Pass an instance as the *metrics* argument of :class:`Context` (or of
+    :func:`splunklib.client.connect`), then call :meth:`summary` to see which
+    endpoints take the most time.
+
+    **Example**::
+
+        import splunklib.binding as binding
+        import splunklib.client as client
+        metrics = binding.MetricsRecorder()
+        s = client.connect(metrics=metrics, ...)
+        ...
+        for endpoint in metrics.summary()[:5]:
+            print "%(method)s %(path)s: %(count)d requests, p90 %(p90).3fs" % endpoint
+    """
+    # Upper bounds of the latency histogram buckets, in seconds. Times above
+    # the last bound are counted in one more bucket.
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.method, event.path)
+        total_time = event.total_time or 0.0
+        bucket = 0
+        while bucket < len(self.buckets) and total_time > self.buckets[bucket]:
+            bucket += 1
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = {
+                    'count': 0, 'errors': 0, 'bytes_in': 0, 'bytes_decoded': 0, 'bytes_out': 0,
+                    'connect_time': 0.0, 'ttfb': 0.0, 'total_time': 0.0,
+                    'max_time': 0.0, 'retries': 0, 'auth_refreshes': 0,
+                    'histogram': [0] * (len(self.buckets) + 1)}
+            endpoint['count'] += 1
+            if event.error is not None or event.status >= 400:
+                endpoint['errors'] += 1
+            endpoint['bytes_in'] += event.bytes_in
+            endpoint['bytes_decoded'] += event.bytes_decoded
+            endpoint['bytes_out'] += event.bytes_out
+            endpoint['connect_time'] += event.connect_time or 0.0
+            endpoint['ttfb'] += event.ttfb or 0.0
+            endpoint['total_time'] += total_time
+            endpoint['max_time'] = max(endpoint['max_time'], total_time)
+            endpoint['retries'] += event.retries
+            endpoint['auth_refreshes'] += event.auth_refreshes
+            endpoint['histogram'][bucket] += 1
+
+    def reset(self):
+        """Forgets every request recorded so far."""
+        with self._lock:
+            self._endpoints = {}
+
+    def summary(self):
+        """Returns the metrics of each endpoint, the slowest in total first.
+
+        :return: A list of records with the fields ``method``, ``path``,
+            ``count``, ``errors``, ``bytes_in``, ``bytes_decoded``, ``bytes_out``,
+            ``connect_time``, ``ttfb``, ``total_time`` (sums over all
+            requests), ``mean_time``, ``max_time``, ``p50``, ``p90``, ``p99``
+            (the upper bounds of the histogram buckets those percentiles fall
+            in), ``retries``, ``auth_refreshes``, and ``histogram`` (the
+            request count in each bucket of :attr:`buckets`).
+        """
+        with self._lock:
+            endpoints = [(key, dict(endpoint, histogram=list(endpoint['histogram'])))
+                         for key, endpoint in self._endpoints.iteritems()]
+        summary = []
+        for (method, path), endpoint in endpoints:
+            endpoint['method'] = method
+            endpoint['path'] = path
+            endpoint['mean_time'] = endpoint['total_time'] / endpoint['count']
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                endpoint[name] = self._percentile(endpoint, fraction)
+            summary.append(record(endpoint))
+        summary.sort(key=lambda endpoint: endpoint.total_time, reverse=True)
+        return summary
+
+    def _percentile(self, endpoint, fraction):
+        rank = fraction * endpoint['count']
+        seen = 0
+        for bucket, count in enumerate(endpoint['histogram']):
+            seen += count
+            if seen >= rank and count > 0:
+                if bucket < len(self.buckets):
+                    return min(self.buckets[bucket], endpoint['max_time'])
+                break
+        return endpoint['max_time']
+
+
 # Given an HTTP request handler, this wrapper objects provides a related
 # family of convenience methods built using that handler.
 class HttpLib(object):
@@ -991,12 +1368,57 @@ class HttpLib(object):
         - body: A stream-like object supporting ``read(size=None)`` and ``close()``
           methods to get the body of the response.
 
+    The response dictionary may also have the keys ``bytes_sent``,
+    ``connect_time``, and ``retries``, which are only used for metrics.
+
     The response dictionary is returned directly by ``HttpLib``'s methods with
     no further processing. By default, ``HttpLib`` calls the :func:`handler` function
     to get a handler function.
+
+    If a *metrics* function is given, it is called once for each request, when
+    the body of its response has been read to the end or closed, with a
+    record with the following fields:
+
+        - method: The method of the request.
+
+        - url: The URL of the request.
+
+        - path: The path of the URL, with the namespace and the name of the
+          entity replaced by placeholders, such as
+          ``/servicesNS/{owner}/{app}/saved/searches/{name}/dispatch``.
+
+        - status: The status code of the response, or ``None`` if no response
+          was received.
+
+        - bytes_out: The size of the request body, as sent, after any
+          compression.
+
+        - bytes_in: The size of the response body, as received, before any
+          decompression, so that it compares with ``bytes_out``.
+
+        - bytes_decoded: The size of the response body, as read, after any
+          decompression.
+
+        - connect_time: The time taken to connect, in seconds, or ``None`` if
+          the handler does not report it.
+
+        - ttfb: The time until the response headers were received, in
+          seconds.
+
+        - total_time: The time until the response body was finished with, in
+          seconds.
+
+        - retries: The number of times the request was sent again on a new
+          connection.
+
+        - auth_refreshes: 1 if the request was sent again after logging in
+          again, otherwise 0.
+
+        - error: The exception raised if no response was received.
     """
-    def __init__(self, custom_handler=None):
+    def __init__(self, custom_handler=None, metrics=None):
         self.handler = handler() if custom_handler is None else custom_handler
+        self.metrics = metrics
 
     def delete(self, url, headers=None, **kwargs):
         """Sends a DELETE request to a URL.
@@ -1102,12 +1524,60 @@ class HttpLib(object):
             its structure).
         :rtype: ``dict``
         """
-        response = self.handler(url, message, **kwargs)
-        response = record(response)
+        if self.metrics is None:
+            response = record(self.handler(url, message, **kwargs))
+        else:
+            response = self._metered_request(url, message, **kwargs)
         if 400 <= response.status:
             raise HTTPError(response)
         return response
 
+    def _metered_request(self, url, message, **kwargs):
+        auth_refreshes = getattr(_request_state, 'auth_refreshes', 0)
+        _request_state.auth_refreshes = 0
+        event = record({
+            'method': message.get('method', 'GET'),
+            'url': url,
+            'path': _path_template(url),
+            'status': None,
+            'bytes_out': len(message.get('body', '')),
+            'bytes_in': 0,
+            'bytes_decoded': 0,
+            'connect_time': None,
+            'ttfb': None,
+            'total_time': None,
+            'retries': 0,
+            'auth_refreshes': auth_refreshes,
+            'error': None})
+        start = time.time()
+        try:
+            response = record(self.handler(url, message, **kwargs))
+        except Exception as e:
+            event.total_time = time.time() - start
+            event.error = e
+            self._emit(event)
+            raise
+        event.ttfb = time.time() - start
+        event.status = response.status
+        event.bytes_out = response.get('bytes_sent', event.bytes_out)
+        event.connect_time = response.get('connect_time')
+        event.retries = response.get('retries', 0)
+
+        def finish(bytes_in, bytes_decoded):
+            event.bytes_in = bytes_in
+            event.bytes_decoded = bytes_decoded
+            event.total_time = time.time() - start
+            self._emit(event)
+
+        response.body = _MeteredBody(response.body, finish)
+        return response
+
+    def _emit(self, event):
+        try:
+            self.metrics(event)
+        except Exception:
+            logging.exception("Request metrics function failed.")
+
 
 # Converts an httplib response into a file-like object.
 class ResponseReader(object):
@@ -1116,17 +1586,36 @@ class ResponseReader(object):
     The ``ResponseReader`` class is intended to be a layer to unify the different
     types of HTTP libraries used with this SDK. This class also provides a
     preview of the stream and a few useful predicates.
+
+    :param response: The response to read from.
+    :param release: A function called once the response is finished with
+        (optional). It is passed ``True`` if the whole body was read, so the
+        underlying connection can be reused, or ``False`` if the response was
+        closed or garbage collected early.
     """
     # For testing, you can use a StringIO as the argument to
     # ``ResponseReader`` instead of an ``httplib.HTTPResponse``. It
     # will work equally well.
-    def __init__(self, response):
+    def __init__(self, response, release=None):
         self._response = response
         self._buffer = ''
+        self._release = release
+        self._bytes_read = 0
+
+    def __del__(self):
+        # A response dropped before it was read to the end still gives its
+        # connection back.
+        self._finish(False)
 
     def __str__(self):
         return self.read()
 
+    @property
+    def bytes_received(self):
+        """The number of bytes of the body received so far, before any
+        decompression."""
+        return getattr(self._response, 'bytes_received', self._bytes_read)
+
     @property
     def empty(self):
         """Indicates whether there is any more data in the response."""
@@ -1147,6 +1636,7 @@ class ResponseReader(object):
 
     def close(self):
         """Closes this response."""
+        self._finish(False)
         self._response.close()
 
     def read(self, size = None):
@@ -1161,22 +1651,22 @@ class ResponseReader(object):
         self._buffer = ''
         if size is not None:
             size -= len(r)
-        r = r + self._response.read(size)
+        data = self._response.read(size)
+        self._bytes_read += len(data)
+        r = r + data
+        if self._release is not None and self._response.isclosed():
+            self._finish(True)
         return r
 
+    def _finish(self, reusable):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(reusable)
 
-def handler(key_file=None, cert_file=None, timeout=None):
-    """This class returns an instance of the default HTTP request handler using
-    the values you provide.
-
-    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
-    :type key_file: ``string``
-    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
-    :type cert_file: ``string``
-    :param `timeout`: The request time-out period, in seconds (optional).
-    :type timeout: ``integer`` or "None"
-    """
 
+def _connector(key_file=None, cert_file=None, timeout=None):
+    # Returns a function that opens a new httplib connection for a
+    # (scheme, host, port) triple.
     def connect(scheme, host, port):
         kwargs = {}
         if timeout is not None: kwargs['timeout'] = timeout
@@ -1187,22 +1677,140 @@ def handler(key_file=None, cert_file=None, timeout=None):
             if cert_file is not None: kwargs['cert_file'] = cert_file
             return httplib.HTTPSConnection(host, port, **kwargs)
         raise ValueError("unsupported scheme: %s" % scheme)
+    return connect
+
+
+def _request_head(host, body, headers, compression=False):
+    head = {
+        "Content-Length": str(len(body)),
+        "Host": host,
+        "User-Agent": "splunk-sdk-python/0.1",
+        "Accept": "*/*",
+    } # defaults
+    if compression:
+        head["Accept-Encoding"] = "gzip, deflate"
+    for key, value in headers:
+        head[key] = value
+    return head
+
+
+def _compress_body(body, head, threshold):
+    # Gzips a request body of at least *threshold* bytes, unless the caller
+    # already encoded it. Returns the body to send.
+    if threshold is None or len(body) < threshold:
+        return body
+    if any(key.lower() == "content-encoding" for key in head):
+        return body
+    if isinstance(body, unicode):
+        body = body.encode("utf-8")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    body = compressor.compress(body) + compressor.flush()
+    head["Content-Encoding"] = "gzip"
+    head["Content-Length"] = str(len(body))
+    return body
+
+
+def _decoded(response):
+    # Wraps an httplib response so that reading it decompresses its body,
+    # according to its Content-Encoding header.
+    encoding = (response.getheader("content-encoding") or "identity").strip().lower()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        return _DecompressingResponse(response, encoding)
+    return response
+
+
+class _DecompressingResponse(object):
+    """Decompresses a gzip or deflate encoded response as it is read.
+
+    Only as much of the compressed body is read as is needed to return the
+    number of characters asked for, so :class:`ResponseReader` can still read
+    and peek incrementally.
+    """
+    _chunk_size = 16 * 1024
+
+    def __init__(self, response, encoding):
+        self._response = response
+        if encoding == "deflate":
+            self._decompressor = zlib.decompressobj()
+            self._deflate = True
+        else:
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._deflate = False
+        self._buffer = ''
+        self._eof = False
+        self.bytes_received = 0
+
+    def close(self):
+        self._response.close()
+
+    def isclosed(self):
+        return self._response.isclosed()
+
+    def read(self, size=None):
+        while not self._eof and (size is None or len(self._buffer) < size):
+            chunk = self._response.read(None if size is None else self._chunk_size)
+            if not chunk:
+                self._buffer += self._decompressor.flush()
+                self._eof = True
+                break
+            self.bytes_received += len(chunk)
+            self._buffer += self._decompress(chunk)
+        if size is None:
+            r, self._buffer = self._buffer, ''
+        else:
+            r, self._buffer = self._buffer[:size], self._buffer[size:]
+        return r
+
+    def _decompress(self, chunk):
+        try:
+            return self._decompressor.decompress(chunk)
+        except zlib.error:
+            # Some servers send deflate data without its zlib header
+            if not self._deflate:
+                raise
+            self._deflate = False
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(chunk)
+
+
+def handler(key_file=None, cert_file=None, timeout=None, compression=True,
+            compress_threshold=None):
+    """This class returns an instance of the default HTTP request handler using
+    the values you provide.
+
+    Unless *compression* is ``False``, the handler asks for gzip or deflate
+    encoded responses and decompresses them as they are read, so the response
+    body is always uncompressed. Request bodies of at least
+    *compress_threshold* bytes are sent gzipped; only set it for endpoints
+    that accept ``Content-Encoding: gzip``.
+
+    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
+    :type key_file: ``string``
+    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
+    :type cert_file: ``string``
+    :param `timeout`: The request time-out period, in seconds (optional).
+    :type timeout: ``integer`` or "None"
+    :param `compression`: Whether to ask for compressed responses (the
+        default is ``True``).
+    :type compression: ``boolean``
+    :param `compress_threshold`: The size, in bytes, from which request bodies
+        are compressed (optional, the default is never).
+    :type compress_threshold: ``integer``
+    """
+    connect = _connector(key_file, cert_file, timeout)
 
     def request(url, message, **kwargs):
         scheme, host, port, path = _spliturl(url)
         body = message.get("body", "")
-        head = {
-            "Content-Length": str(len(body)),
-            "Host": host,
-            "User-Agent": "splunk-sdk-python/0.1",
-            "Accept": "*/*",
-        } # defaults
-        for key, value in message["headers"]:
-            head[key] = value
+        head = _request_head(host, body, message["headers"], compression)
+        body = _compress_body(body, head, compress_threshold)
         method = message.get("method", "GET")
 
         connection = connect(scheme, host, port)
         try:
+            start = time.time()
+            connection.connect()
+            connect_time = time.time() - start
             connection.request(method, path, body, head)
             if timeout is not None:
                 connection.sock.settimeout(timeout)
@@ -1214,7 +1822,199 @@ def handler(key_file=None, cert_file=None, timeout=None):
             "status": response.status,
             "reason": response.reason,
             "headers": response.getheaders(),
-            "body": ResponseReader(response),
+            "body": ResponseReader(_decoded(response)),
+            "bytes_sent": len(body),
+            "connect_time": connect_time,
+        }
+
+    return request
+
+
+class _ConnectionPool(object):
+    """A thread-safe pool of keep-alive connections, kept per
+    (scheme, host, port).
+
+    Connections are handed out with :meth:`acquire` and given back with
+    :meth:`release` once their response has been read to the end, or with
+    :meth:`discard` if they cannot be reused. At most *max_connections*
+    connections, idle or in use, are open to each host at once; when they
+    are all in use, :meth:`acquire` waits for one to be given back. Idle
+    connections older than *idle_timeout* seconds are closed instead of being
+    reused.
+    """
+    def __init__(self, connect, max_connections, idle_timeout):
+        self._connect = connect
+        self._max_connections = max(1, max_connections)
+        self._idle_timeout = idle_timeout
+        self._idle = {}
+        self._open = {}
+        self._available = threading.Condition(threading.Lock())
+
+    def acquire(self, scheme, host, port):
+        """Returns a ``(connection, reused)`` pair for the given host, where
+        *reused* indicates whether the connection came from the pool."""
+        key = (scheme, host, port)
+        expired = []
+        connection = None
+        with self._available:
+            idle = self._idle.setdefault(key, [])
+            while True:
+                now = time.time()
+                while idle:
+                    candidate, last_used = idle.pop()
+                    if now - last_used < self._idle_timeout:
+                        connection = candidate
+                        break
+                    expired.append(candidate)
+                    self._open[key] -= 1
+                if connection is not None:
+                    break
+                if self._open.get(key, 0) < self._max_connections:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    break
+                self._available.wait()
+        for candidate in expired:
+            candidate.close()
+        if connection is not None:
+            return connection, True
+        try:
+            return self._connect(scheme, host, port), False
+        except:
+            self._closed(key)
+            raise
+
+    def release(self, scheme, host, port, connection):
+        """Returns a connection whose response has been fully read to the
+        pool."""
+        key = (scheme, host, port)
+        with self._available:
+            self._idle.setdefault(key, []).append((connection, time.time()))
+            self._available.notify()
+
+    def discard(self, scheme, host, port, connection):
+        """Closes a connection that cannot be reused, making room for a new
+        one."""
+        connection.close()
+        self._closed((scheme, host, port))
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._available:
+            idle, self._idle = self._idle, {}
+            for key, connections in idle.iteritems():
+                self._open[key] -= len(connections)
+            self._available.notify_all()
+        for connections in idle.itervalues():
+            for connection, _ in connections:
+                connection.close()
+
+    def _closed(self, key):
+        with self._available:
+            self._open[key] -= 1
+            self._available.notify()
+
+
+# Errors that show a pooled connection was closed by the server while it sat
+# idle. The request never reached the server, so it is safe to send it again
+# on a new connection.
+_STALE_CONNECTION_ERRNOS = (errno.EPIPE, errno.ECONNRESET, errno.ECONNABORTED)
+
+def _is_stale_connection_error(e):
+    if isinstance(e, (httplib.BadStatusLine, httplib.CannotSendRequest)):
+        return True
+    if isinstance(e, socket.error) and not isinstance(e, socket.timeout):
+        return e.errno in _STALE_CONNECTION_ERRNOS
+    return False
+
+
+def pooled_handler(key_file=None, cert_file=None, timeout=None,
+                   max_connections=10, idle_timeout=30, compression=True,
+                   compress_threshold=None):
+    """This function returns an HTTP request handler that keeps connections to
+    splunkd alive and reuses them across requests, instead of opening a new
+    connection (and, for HTTPS, doing a new TLS handshake) for every request.
+
+    A connection is returned to the pool once its response body has been read
+    to the end, and closed once the response is closed or garbage collected
+    before that. At most *max_connections* connections are open to each host;
+    further requests wait until a response is finished with, so read or close
+    every response you get back. If the server
+    has closed an idle connection, the request is transparently sent again on
+    a new one. The handler can be shared by several :class:`Context` objects
+    and threads. Responses and request bodies are compressed as they are by
+    :func:`handler`.
+
+    :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
+    :type key_file: ``string``
+    :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
+    :type cert_file: ``string``
+    :param `timeout`: The request time-out period, in seconds (optional).
+    :type timeout: ``integer`` or "None"
+    :param `max_connections`: The maximum number of connections, idle or in
+        use, open to each scheme, host, and port (the default is 10).
+    :type max_connections: ``integer``
+    :param `idle_timeout`: The number of seconds an idle connection is kept
+        before it is closed (the default is 30).
+    :type idle_timeout: ``integer``
+    :param `compression`: Whether to ask for compressed responses (the
+        default is ``True``).
+    :type compression: ``boolean``
+    :param `compress_threshold`: The size, in bytes, from which request bodies
+        are compressed (optional, the default is never).
+    :type compress_threshold: ``integer``
+
+    **Example**::
+
+        import splunklib.client as client
+        s = client.connect(handler=binding.pooled_handler(), ...)
+    """
+    pool = _ConnectionPool(_connector(key_file, cert_file, timeout),
+                           max_connections, idle_timeout)
+
+    def request(url, message, **kwargs):
+        scheme, host, port, path = _spliturl(url)
+        body = message.get("body", "")
+        head = _request_head(host, body, message["headers"], compression)
+        body = _compress_body(body, head, compress_threshold)
+        method = message.get("method", "GET")
+
+        connect_time = 0.0
+        retries = 0
+        while True:
+            connection, reused = pool.acquire(scheme, host, port)
+            try:
+                if not reused:
+                    start = time.time()
+                    connection.connect()
+                    connect_time += time.time() - start
+                connection.request(method, path, body, head)
+                if timeout is not None:
+                    connection.sock.settimeout(timeout)
+                response = connection.getresponse()
+                break
+            except Exception as e:
+                pool.discard(scheme, host, port, connection)
+                if reused and _is_stale_connection_error(e):
+                    logging.debug("Pooled connection to %s:%s was closed; reconnecting", host, port)
+                    retries += 1
+                    continue
+                raise
+
+        def release(reusable):
+            if reusable and not response.will_close:
+                pool.release(scheme, host, port, connection)
+            else:
+                pool.discard(scheme, host, port, connection)
+
+        return {
+            "status": response.status,
+            "reason": response.reason,
+            "headers": response.getheaders(),
+            "body": ResponseReader(_decoded(response), release),
+            "bytes_sent": len(body),
+            "connect_time": connect_time,
+            "retries": retries,
         }
 
+    request.close = pool.close
     return request
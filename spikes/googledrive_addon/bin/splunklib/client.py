@@ -66,6 +66,10 @@ from time import sleep
 from datetime import datetime, timedelta
 import socket
 import contextlib
+import threading
+import time
+from collections import deque
+from multiprocessing.pool import ThreadPool
 
 from binding import Context, HTTPError, AuthenticationError, namespace, UrlEncoded, _encode
 from data import record
@@ -77,6 +81,8 @@ __all__ = [
     "OperationError",
     "IncomparableException",
     "Service",
+    "JobWaiter",
+    "BulkSubmitter",
     "namespace"
 ]
 
@@ -182,7 +188,7 @@ def _path(base, name):
 
 # Load an atom record from the body of the given response
 def _load_atom(response, match=None):
-    return data.load(response.body.read(), match)
+    return data.parse(response.body, match)
 
 # Load an array of atom entries from the body of the given response
 def _load_atom_entries(response):
@@ -252,7 +258,8 @@ def connect(**kwargs):
     """This function connects and logs in to a Splunk instance.
 
     This function is a shorthand for :meth:`Service.login`.
-    The ``connect`` function makes one round trip to the server (for logging in).
+    The ``connect`` function makes one round trip to the server (for logging in),
+    or none if it finds a session token in *session_cache*.
 
     :param host: The host name (the default is "localhost").
     :type host: ``string``
@@ -277,6 +284,9 @@ def connect(**kwargs):
     :type username: ``string``
     :param `password`: The password for the Splunk account.
     :type password: ``string``
+    :param `session_cache`: A cache of session tokens to use instead of
+        logging in, when it holds one for this server and username (optional).
+    :type session_cache: :class:`splunklib.binding.SessionCache`
     :return: An initialized :class:`Service` connection.
 
     **Example**::
@@ -1315,19 +1325,30 @@ class ReadOnlyCollection(Endpoint):
         content = _load_atom(response, MATCH_ENTRY_CONTENT)
         return _parse_atom_metadata(content)
 
-    def iter(self, offset=0, count=None, pagesize=None, **kwargs):
+    def iter(self, offset=0, count=None, pagesize=None, prefetch=0, **kwargs):
         """Iterates over the collection.
 
         This method is equivalent to the :meth:`list` method, but
         it returns an iterator and can load a certain number of entities at a
         time from the server.
 
+        With *pagesize* and *prefetch* set, up to *prefetch* pages are
+        requested and parsed concurrently, on a pool of as many threads,
+        while the entities of earlier pages are yielded. Entities are still
+        yielded in order. Listing a large collection is then limited by
+        bandwidth rather than by the latency of one request after another.
+        A few pages beyond the end of the collection may be requested and
+        discarded.
+
         :param offset: The index of the first entity to return (optional).
         :type offset: ``integer``
         :param count: The maximum number of entities to return (optional).
         :type count: ``integer``
         :param pagesize: The number of entities to load (optional).
         :type pagesize: ``integer``
+        :param prefetch: The number of pages to keep in flight (optional).
+            Only used with *pagesize*.
+        :type prefetch: ``integer``
         :param kwargs: Additional arguments (optional):
 
             - "search" (``string``): The search query to filter responses.
@@ -1350,10 +1371,18 @@ class ReadOnlyCollection(Endpoint):
                 # Loads 10 saved searches at a time from the
                 # server.
                 ...
+            for job in s.jobs.iter(pagesize=100, prefetch=4):
+                # Loads 100 jobs at a time, with up to 4 requests in
+                # flight.
+                ...
         """
         assert pagesize is None or pagesize > 0
         if count is None:
             count = self.null_count
+        if pagesize is not None and prefetch > 0:
+            for item in self._iter_prefetch(offset, count, pagesize, prefetch, **kwargs):
+                yield item
+            return
         fetched = 0
         while count == self.null_count or fetched < count:
             response = self.get(count=pagesize or count, offset=offset, **kwargs)
@@ -1367,6 +1396,32 @@ class ReadOnlyCollection(Endpoint):
             offset += N
             logging.debug("pagesize=%d, fetched=%d, offset=%d, N=%d, kwargs=%s", pagesize, fetched, offset, N, kwargs)
 
+    def _iter_prefetch(self, offset, count, pagesize, prefetch, **kwargs):
+        # Pages are requested in order and consumed in order, so the first
+        # page still outstanding is always the next one to yield.
+        limit = None if count == self.null_count else offset + count
+        pool = ThreadPool(prefetch)
+        try:
+            pages = deque()
+            next_offset = offset
+            while True:
+                while len(pages) < prefetch and (limit is None or next_offset < limit):
+                    pages.append(pool.apply_async(
+                        self._load_page, (next_offset, pagesize, kwargs)))
+                    next_offset += pagesize
+                if len(pages) == 0:
+                    return
+                items = pages.popleft().get()
+                for item in items:
+                    yield item
+                if len(items) < pagesize:
+                    return
+        finally:
+            pool.terminate()
+
+    def _load_page(self, offset, pagesize, kwargs):
+        return self._load_list(self.get(count=pagesize, offset=offset, **kwargs))
+
     # kwargs: count, offset, search, sort_dir, sort_key, sort_mode
     def list(self, count=None, **kwargs):
         """Retrieves a list of entities in this collection.
@@ -1738,8 +1793,7 @@ class Index(Entity):
                    "Authorization: %s\r\n" % self.service.token,
                    "X-Splunk-Input-Mode: Streaming\r\n",
                    "\r\n"]
-        for h in headers:
-            sock.write(h)
+        sock.sendall(''.join(headers))
         return sock
 
     @contextlib.contextmanager
@@ -1776,6 +1830,27 @@ class Index(Entity):
             sock.shutdown(socket.SHUT_RDWR)
             sock.close()
 
+    def bulk_submitter(self, **kwargs):
+        """Returns a :class:`BulkSubmitter` that writes events to this index
+        in batches over persistent streams.
+
+        :param kwargs: Batching parameters for :class:`BulkSubmitter`
+            (optional).
+
+        :return: A :class:`BulkSubmitter`.
+
+        **Example**::
+
+            import splunklib.client as client
+            s = client.connect(...)
+            index = s.indexes['some_index']
+            with index.bulk_submitter() as submitter:
+                for line in lines:
+                    submitter.submit(line, sourcetype='pas:audit')
+            print submitter.stats
+        """
+        return BulkSubmitter(self, **kwargs)
+
     def clean(self, timeout=60):
         """Deletes the contents of the index.
 
@@ -1877,6 +1952,224 @@ class Index(Entity):
         return self
 
 
+class BulkSubmitter(object):
+    """Writes events to an index in batches, from a background thread.
+
+    :meth:`submit` adds an event to a pending batch and returns at once.
+    A batch is written when it reaches *max_batch_size* bytes, when it has
+    waited *max_batch_delay* seconds, or on :meth:`flush`. Batches are
+    written over streams opened with :meth:`Index.attach`, which stay open
+    for the life of the submitter. As a stream carries a single host, source
+    and sourcetype, one stream is opened for each combination used.
+
+    Pending and unwritten events take at most *max_queue_size* bytes. When
+    they reach it, :meth:`submit` blocks until the background thread catches
+    up, or raises :class:`OperationError` after *timeout* seconds.
+
+    If writing a batch fails, the stream is opened again and the batch
+    written once more, so an event may be delivered twice. Batches that still
+    cannot be written are counted in ``stats.events_failed`` and the error is
+    kept in ``stats.last_error``.
+
+    :param index: The :class:`Index` to write to.
+    :param max_batch_size: The size of a batch, in bytes.
+    :type max_batch_size: ``integer``
+    :param max_batch_delay: The longest time an event waits to be written,
+        in seconds.
+    :type max_batch_delay: ``float``
+    :param max_queue_size: The most bytes of events held in memory.
+    :type max_queue_size: ``integer``
+    :param timeout: The longest time :meth:`submit` blocks, in seconds, or
+        ``None`` to wait indefinitely.
+    :type timeout: ``float``
+    """
+    def __init__(self, index, max_batch_size=1 << 20, max_batch_delay=1.0,
+                 max_queue_size=64 << 20, timeout=None):
+        self.index = index
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self.stats = record({
+            'events_submitted': 0,
+            'events_sent': 0,
+            'events_failed': 0,
+            'bytes_sent': 0,
+            'batches_sent': 0,
+            'last_error': None})
+        self._pending = {}      # (host, source, sourcetype) -> [events, size, created]
+        self._ready = deque()   # Batches waiting to be written
+        self._queued = 0        # Bytes pending or waiting to be written
+        self._sending = False
+        self._streams = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='BulkSubmitter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, event, host=None, source=None, sourcetype=None):
+        """Adds an event to the batch for its host, source and sourcetype.
+
+        A line break is added to *event* if it does not end with one.
+
+        :param event: The event to submit.
+        :type event: ``string``
+        :param `host`: The host value of the event.
+        :type host: ``string``
+        :param `source`: The source value of the event.
+        :type source: ``string``
+        :param `sourcetype`: The sourcetype value of the event.
+        :type sourcetype: ``string``
+        :raises OperationError: Raised if the submitter is closed, or if the
+            queue stays full for longer than *timeout* seconds.
+        """
+        if isinstance(event, unicode):
+            event = event.encode('utf-8')
+        if not event.endswith('\n'):
+            event += '\n'
+        size = len(event)
+        key = (host, source, sourcetype)
+        with self._condition:
+            if self._queued + size > self.max_queue_size and self._queued > 0:
+                self._wait_for_room(size)
+            if self._closed:
+                raise OperationError, "BulkSubmitter is closed."
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = [[], 0, time.time()]
+                # Wake the background thread so that it waits on this batch's delay
+                self._condition.notify_all()
+            batch[0].append(event)
+            batch[1] += size
+            self._queued += size
+            self.stats.events_submitted += 1
+            if batch[1] >= self.max_batch_size:
+                del self._pending[key]
+                self._ready.append((key, batch[0], batch[1]))
+                self._condition.notify_all()
+        return self
+
+    def flush(self, timeout=None):
+        """Writes every pending event and waits until they are written.
+
+        :param timeout: The longest time to wait, in seconds (optional).
+        :type timeout: ``float``
+        :return: ``True`` if every event was written, ``False`` on a timeout.
+        :rtype: ``boolean``
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            self._release_pending(force=True)
+            while len(self._ready) > 0 or self._sending:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flushes the pending events, stops the background thread and
+        closes the streams.
+
+        :param timeout: The longest time to wait for the flush, in seconds
+            (optional).
+        :type timeout: ``float``
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        for stream in self._streams.itervalues():
+            self._close_stream(stream)
+        self._streams.clear()
+
+    def _wait_for_room(self, size):
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        # Hand the background thread everything pending, so that waiting
+        # for room does not also wait for the batch delay.
+        self._release_pending(force=True)
+        while self._queued + size > self.max_queue_size and self._queued > 0 \
+                and not self._closed:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                raise OperationError, "BulkSubmitter queue stayed full for %s seconds." % self.timeout
+            self._condition.wait(remaining)
+
+    def _release_pending(self, force=False):
+        # Moves batches that are due to the ready queue. Called with the
+        # condition held.
+        now = time.time()
+        for key, batch in self._pending.items():
+            if force or now - batch[2] >= self.max_batch_delay:
+                del self._pending[key]
+                self._ready.append((key, batch[0], batch[1]))
+        if len(self._ready) > 0:
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._ready) == 0 and not self._closed:
+                    if len(self._pending) == 0:
+                        self._condition.wait()
+                    else:
+                        oldest = min(batch[2] for batch in self._pending.itervalues())
+                        delay = oldest + self.max_batch_delay - time.time()
+                        if delay > 0:
+                            self._condition.wait(delay)
+                    self._release_pending()
+                if len(self._ready) == 0:
+                    return
+                key, events, size = self._ready.popleft()
+                self._sending = True
+            try:
+                self._send(key, events, size)
+            finally:
+                with self._condition:
+                    self._sending = False
+                    self._queued -= size
+                    self._condition.notify_all()
+
+    def _send(self, key, events, size):
+        data = ''.join(events)
+        for attempt in (1, 2):
+            try:
+                stream = self._streams.get(key)
+                if stream is None:
+                    host, source, sourcetype = key
+                    stream = self._streams[key] = self.index.attach(host, source, sourcetype)
+                stream.sendall(data)
+                self.stats.events_sent += len(events)
+                self.stats.bytes_sent += size
+                self.stats.batches_sent += 1
+                return
+            except Exception as e:
+                stream = self._streams.pop(key, None)
+                if stream is not None:
+                    self._close_stream(stream)
+                if attempt == 2:
+                    logging.error("BulkSubmitter failed to write %d events to index %s: %s",
+                                  len(events), self.index.name, e)
+                    self.stats.events_failed += len(events)
+                    self.stats.last_error = e
+
+    @staticmethod
+    def _close_stream(stream):
+        try:
+            stream.shutdown(socket.SHUT_RDWR)
+            stream.close()
+        except socket.error:
+            pass
+
+
 class Input(Entity):
     """This class represents a Splunk input. This class is the base for all
     typed input classes and is also used when the client does not recognize an
@@ -2453,6 +2746,10 @@ class Job(Entity):
     def is_done(self):
         """Indicates whether this job finished running.
 
+        Each call makes a roundtrip to the server. To wait for several jobs,
+        use :meth:`Jobs.wait` or a :class:`JobWaiter`, which poll all of them
+        with one request per round.
+
         :return: ``True`` if the job is done, ``False`` if not.
         :rtype: ``boolean``
         """
@@ -2517,6 +2814,10 @@ class Job(Entity):
         Results are not available until the job has finished. If called on
         an unfinished job, the result is an empty event set.
 
+        For large result sets, pass ``output_mode="json"`` and read the
+        handle with :class:`splunklib.results.JSONResultsReader`, which is
+        much faster than parsing XML.
+
         This method makes a single roundtrip
         to the server, plus at most two additional round trips if
         the ``autologin`` field of :func:`connect` is set to ``True``.
@@ -2723,6 +3024,10 @@ class Jobs(Collection):
         preview search because no post-processing is done on the retrieved
         events. The raw events are simply returned.
 
+        To write the results of a large export to files on disk, use
+        :class:`splunklib.export.Exporter`, which streams them to rotated,
+        compressed files and resumes if the connection drops.
+
         The ``export`` method makes a single roundtrip to the server (as opposed
         to two for :meth:`create` followed by :meth:`preview`), plus at most two
         more if the ``autologin`` field of :func:`connect` is set to ``True``.
@@ -2808,6 +3113,288 @@ class Jobs(Collection):
                          exec_mode="oneshot", 
                          **params).body
 
+    def wait(self, jobs, timeout=None, **kwargs):
+        """Waits for several search jobs to finish.
+
+        The status of every job is polled with a single request per round by
+        a :class:`JobWaiter`, rather than with one request per job as a
+        ``while not job.is_done()`` loop would make. ::
+
+            import splunklib.client as client
+            service = client.connect(...)
+            jobs = [service.jobs.create(query) for query in queries]
+            for job in service.jobs.wait(jobs, timeout=300):
+                print job.sid, job['resultCount']
+
+        :param jobs: The jobs to wait for.
+        :type jobs: ``list`` of :class:`Job`
+        :param timeout: The longest time to wait, in seconds (optional).
+        :type timeout: ``float``
+        :param kwargs: Polling parameters for :class:`JobWaiter` (optional).
+        :raises OperationError: Raised if the jobs do not finish within
+            *timeout* seconds.
+        :return: The jobs, refreshed, in the order given.
+        """
+        waiter = JobWaiter(self.service, **kwargs)
+        try:
+            futures = [waiter.add(job) for job in jobs]
+            deadline = None if timeout is None else time.time() + timeout
+            for future in futures:
+                remaining = None if deadline is None else max(0, deadline - time.time())
+                future.result(remaining)
+            return list(jobs)
+        finally:
+            waiter.close()
+
+
+class Future(object):
+    """The eventual result of an operation that finishes on another thread.
+
+    This is the base of :class:`JobFuture` and of the futures returned by
+    :class:`splunklib.futures.AsyncService`, so both can be passed to
+    :func:`splunklib.futures.gather` and
+    :func:`splunklib.futures.as_completed`.
+    """
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add_done_callback(self, callback):
+        """Arranges for *callback* to be called with this future when it is
+        done. If it is already done, *callback* is called immediately.
+
+        Callbacks are called on the thread that finished the operation, so
+        they should return quickly.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def done(self):
+        """Indicates whether the operation finished.
+
+        :rtype: ``boolean``
+        """
+        return self._done.is_set()
+
+    def exception(self, timeout=None):
+        """Returns the exception raised by the operation, or ``None`` if it
+        succeeded.
+
+        :param timeout: The longest time to wait, in seconds (optional).
+        :raises OperationError: Raised if the operation does not finish
+            within *timeout* seconds.
+        """
+        if not self._done.wait(timeout):
+            raise OperationError, "%s did not finish within %s seconds." % (self._describe(), timeout)
+        return self._exception
+
+    def result(self, timeout=None):
+        """Waits for the operation to finish and returns its result.
+
+        :param timeout: The longest time to wait, in seconds (optional).
+        :raises OperationError: Raised if the operation does not finish
+            within *timeout* seconds.
+        :return: The value the operation returned. If it raised an exception
+            instead, that exception is raised.
+        """
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self._result
+
+    def _describe(self):
+        return "Operation"
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logging.exception("Callback for %s failed.", self._describe().lower())
+
+    def _finish(self, result=None, exception=None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._result = result
+            self._exception = exception
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+
+class JobFuture(Future):
+    """The eventual outcome of waiting for a :class:`Job` to finish.
+
+    Returned by :meth:`JobWaiter.add`. A ``JobFuture`` is done when its job
+    is done, or when the job could no longer be polled. Its result is the
+    :class:`Job`, refreshed.
+    """
+    def __init__(self, job):
+        super(JobFuture, self).__init__()
+        self.job = job
+
+    def _describe(self):
+        return "Job %s" % self.job.sid
+
+
+class JobWaiter(object):
+    """Waits for many search jobs to finish, using a shared poller.
+
+    A background thread polls the status of every pending job with a single
+    request per round, which lists the jobs on the server with only the
+    fields needed to tell whether they are done. A finished job is refreshed
+    once to load its full state. Jobs the listing does not include, such as
+    jobs in another namespace, are polled individually.
+
+    The interval between rounds starts at *min_interval* and grows by a
+    factor of *backoff* after each round in which no job finished, up to
+    *max_interval*. It drops back to *min_interval* when a job finishes or
+    is added.
+
+    **Example**::
+
+        import splunklib.client as client
+        service = client.connect(...)
+        waiter = client.JobWaiter(service)
+        for query in queries:
+            job = service.jobs.create(query)
+            waiter.add(job, callback=lambda future: handle(future.job))
+        waiter.wait()
+        waiter.close()
+
+    :param service: The :class:`Service` the jobs belong to.
+    :param min_interval: The shortest time between rounds, in seconds.
+    :type min_interval: ``float``
+    :param max_interval: The longest time between rounds, in seconds.
+    :type max_interval: ``float``
+    :param backoff: The factor the interval grows by between rounds.
+    :type backoff: ``float``
+    """
+    # Content fields requested when listing jobs
+    _status_fields = ['sid', 'isDone', 'dispatchState']
+
+    def __init__(self, service, min_interval=0.2, max_interval=5.0, backoff=1.5):
+        self.service = service
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._interval = min_interval
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def add(self, job, callback=None):
+        """Starts waiting for *job* to finish.
+
+        :param job: The job to wait for.
+        :type job: :class:`Job`
+        :param callback: A function to call with the :class:`JobFuture` when
+            the job finishes (optional).
+        :return: A :class:`JobFuture` for the job.
+        """
+        with self._condition:
+            if self._closed:
+                raise IllegalOperationException("JobWaiter is closed.")
+            future = self._pending.get(job.sid)
+            if future is None:
+                future = self._pending[job.sid] = JobFuture(job)
+            self._interval = self.min_interval
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='JobWaiter')
+                self._thread.daemon = True
+                self._thread.start()
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def close(self):
+        """Stops polling. Jobs that have not finished are left running on the
+        server, and their futures fail with :class:`OperationError`.
+        """
+        with self._condition:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+            self._condition.notify_all()
+        for future in pending.itervalues():
+            future._finish(exception=OperationError("JobWaiter was closed."))
+
+    def wait(self, timeout=None):
+        """Waits for every job added so far to finish.
+
+        :param timeout: The longest time to wait, in seconds (optional).
+        :type timeout: ``float``
+        :return: ``True`` if every job finished, ``False`` on a timeout.
+        :rtype: ``boolean``
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while len(self._pending) > 0:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _poll(self, pending):
+        # Returns the futures of the jobs in *pending* that are done, paired
+        # with the exception raised while polling each one, if any.
+        try:
+            response = self.service.jobs.get(count=0, f=self._status_fields)
+            entries = _load_atom_entries(response) or []
+        except Exception as e:
+            logging.warning("Listing search jobs failed: %s", e)
+            return []
+        statuses = {}
+        for entry in entries:
+            content = entry.get('content', {})
+            statuses[content.get('sid')] = content
+        finished = []
+        for sid, future in pending.iteritems():
+            try:
+                status = statuses.get(sid)
+                if status is None:
+                    done = future.job.is_done()
+                elif status.get('isDone') == '1':
+                    future.job.refresh()
+                    done = True
+                else:
+                    done = False
+            except Exception as e:
+                finished.append((future, e))
+                continue
+            if done:
+                finished.append((future, None))
+        return finished
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._pending) == 0 or self._closed:
+                    self._thread = None
+                    return
+                pending = dict(self._pending)
+            finished = self._poll(pending)
+            for future, exception in finished:
+                future._finish(future.job, exception)
+            with self._condition:
+                for future, exception in finished:
+                    self._pending.pop(future.job.sid, None)
+                if len(finished) > 0:
+                    self._interval = self.min_interval
+                    self._condition.notify_all()
+                else:
+                    self._interval = min(self._interval * self.backoff, self.max_interval)
+                if len(self._pending) > 0 and not self._closed:
+                    self._condition.wait(self._interval)
+
 
 class Loggers(Collection):
     """This class represents a collection of service logging categories.
@@ -16,9 +16,15 @@
 format, which is the format used by most of the REST API.
 """
 
+import re
 from xml.etree.ElementTree import XML
 
-__all__ = ["load"]
+try:
+    from xml.etree.cElementTree import XMLParser
+except ImportError:
+    from xml.etree.ElementTree import XMLParser
+
+__all__ = ["load", "parse"]
 
 # LNAME refers to element names without namespaces; XNAME is the same
 # name, but with an XML namespace.
@@ -179,6 +185,207 @@ def load_value(element, nametable=None):
 
     return value
 
+def parse(source, match=None, keys=None):
+    """This function reads the XML of an Atom Feed from a string or a stream
+    and returns the same data structure as :func:`load`, in a single pass.
+
+    Unlike :func:`load`, ``parse`` does not build an element tree that is
+    then walked. It builds records as the XML is read, skips elements outside
+    of *match* without building anything for them, and reads a stream a
+    piece at a time instead of all at once.
+
+    :param source: The XML text, or a stream supporting ``.read()``.
+    :type source: ``string`` or stream
+    :param match: A tag name or a path of tag names and ``*`` wildcards,
+        relative to the root element, to match (optional). Unlike
+        :func:`load`, no other path syntax is supported.
+    :type match: ``string``
+    :param keys: Names of the only ``<s:key>`` entries to load from the
+        dictionaries they belong to (optional). Each name is prefixed by the
+        name of the element holding the dictionary, so
+        ``["content.dispatchState", "content.isDone"]`` loads just those two
+        keys from the ``<content>`` of each entry. Dictionaries held by other
+        elements are loaded whole.
+    :type keys: ``list``
+    """
+    builder = _RecordBuilder(match, keys)
+    parser = XMLParser(target=builder)
+    if isinstance(source, basestring):
+        source = source.strip()
+        if len(source) == 0: return None
+        parser.feed(source)
+    else:
+        started = False
+        while True:
+            chunk = source.read(_CHUNK_SIZE)
+            if not chunk: break
+            if not started:
+                # Like load, tolerate whitespace before the XML declaration
+                chunk = chunk.lstrip()
+                if len(chunk) == 0: continue
+                started = True
+            parser.feed(chunk)
+        if not started: return None
+    parser.close()
+    items = builder.items
+    count = len(items)
+    if count == 0:
+        return None
+    elif count == 1:
+        return items[0]
+    else:
+        return items
+
+_CHUNK_SIZE = 64 * 1024
+
+# A step of a match path: a tag, which may have a {namespace} containing
+# slashes, or a wildcard
+_MATCH_STEP = re.compile(r"(?:\{[^}]*\})?[^/]+")
+
+# Stands for the value of a <dict> or <list> element that has not been
+# loaded yet. Their value is almost always loaded as a dict or list by their
+# parent, so the generic record value is only built when asked for.
+_DEFERRED = object()
+
+class _RecordBuilder(object):
+    """Builds the records :func:`load` would return, as an ``XMLParser``
+    target.
+
+    Each element is reduced, when it ends, to a node tuple
+    ``(tag, attrib, value, children, text)``. ``children`` and ``text`` are
+    only kept for ``<dict>`` and ``<list>`` elements, whose value is
+    deferred.
+    """
+    def __init__(self, match=None, keys=None):
+        self.items = []
+        self._steps = None if match is None else _MATCH_STEP.findall(match)
+        self._keys = None
+        if keys is not None:
+            self._keys = {}
+            for key in keys:
+                holder, _, name = key.partition('.')
+                self._keys.setdefault(holder, set()).add(name)
+        self._frames = []   # [tag, attrib, children, text] per open element
+        self._skip = 0      # Depth within an element being skipped
+
+    def start(self, tag, attrib):
+        if self._skip > 0:
+            self._skip += 1
+            return
+        frames = self._frames
+        depth = len(frames)
+        steps = self._steps
+        if steps is not None and 0 < depth <= len(steps):
+            step = steps[depth - 1]
+            if step != '*' and step != tag:
+                self._skip = 1
+                return
+        if self._keys is not None and depth >= 2 and iskey(tag) and \
+                isdict(frames[-1][0]):
+            wanted = self._keys.get(localname(frames[-2][0]))
+            if wanted is not None and attrib.get("name") not in wanted:
+                self._skip = 1
+                return
+        frames.append([tag, attrib, [], []])
+
+    def data(self, data):
+        if self._skip == 0 and len(self._frames) > 0:
+            self._frames[-1][3].append(data)
+
+    def end(self, tag):
+        if self._skip > 0:
+            self._skip -= 1
+            return
+        tag, attrib, children, text = self._frames.pop()
+        text = ''.join(text) if len(children) == 0 else None
+        if isdict(tag) or islist(tag):
+            node = (tag, attrib, _DEFERRED, children, text)
+        else:
+            node = (tag, attrib, _node_value(children, text), None, None)
+        depth = len(self._frames)
+        if (self._steps is None and depth == 0) or \
+                (self._steps is not None and depth == len(self._steps)):
+            self.items.append(_load_node_root(node))
+        elif depth > 0:
+            self._frames[-1][2].append(node)
+
+    def close(self):
+        return None
+
+# Records built here are new, so they have no cached prefixes to forget and
+# can be filled in without going through Record.__setitem__.
+_set = dict.__setitem__
+
+# The equivalent of load_value for an element with the given child nodes
+# and text.
+def _node_value(children, text):
+    count = len(children)
+    if count == 0:
+        if text is None: return None
+        text = text.strip()
+        if len(text) == 0: return None
+        return text
+    if count == 1:
+        child = children[0]
+        if isdict(child[0]) or islist(child[0]):
+            return _load_node_special(child)
+    value = record()
+    for child in children:
+        name, item = _load_node_elem(child)
+        if name in value:
+            current = value[name]
+            if not isinstance(current, list):
+                _set(value, name, [current])
+            value[name].append(item)
+        else:
+            _set(value, name, item)
+    return value
+
+def _load_node_value(node):
+    value = node[2]
+    if value is _DEFERRED:
+        value = _node_value(node[3], node[4])
+    return value
+
+# The equivalent of load_dict or load_list for a <dict> or <list> node
+def _load_node_special(node):
+    if isdict(node[0]):
+        value = record()
+        for child in node[3]:
+            assert iskey(child[0])
+            _set(value, child[1]["name"], _load_node_value(child))
+        return value
+    assert islist(node[0])
+    return [_load_node_value(child) for child in node[3]]
+
+# The equivalent of load_elem for a node
+def _load_node_elem(node):
+    name = localname(node[0])
+    attrs = record(node[1]) if len(node[1]) > 0 else None
+    value = _load_node_value(node)
+    if attrs is None: return name, value
+    if value is None: return name, attrs
+    if isinstance(value, str):
+        _set(attrs, "$text", value)
+        return name, attrs
+    collision_keys = []
+    for key, val in attrs.iteritems():
+        if key in value and key in collision_keys:
+            value[key].append(val)
+        elif key in value and key not in collision_keys:
+            _set(value, key, [value[key], val])
+            collision_keys.append(key)
+        else:
+            _set(value, key, val)
+    return name, value
+
+# The equivalent of load_root for a node
+def _load_node_root(node):
+    tag = node[0]
+    if isdict(tag) or islist(tag): return _load_node_special(node)
+    k, v = _load_node_elem(node)
+    return Record.fromkv(k, v)
+
 # A generic utility that enables "dot" access to dicts
 class Record(dict):
     """This generic utility class enables dot access to members of a Python 
@@ -222,29 +429,116 @@ class Record(dict):
         result[k] = v
         return result
 
+    # Prefix lookups are served from a trie of the dotted keys, built on the
+    # first lookup, and the records they return are kept until this record
+    # is mutated. A record returned for a prefix, and every record nested in
+    # it, remembers its owner, so that mutating it at any depth makes the
+    # owner build it afresh the next time.
+    _Record__trie = None
+    _Record__prefixes = None
+    _Record__owner = None
+
     def __getitem__(self, key):
         if key in self:
             return dict.__getitem__(self, key)
-        key += self.sep
-        result = record()
-        for k,v in self.iteritems():
-            if not k.startswith(key):
-                continue
-            suffix = k[len(key):]
-            if '.' in suffix:
-                ks = suffix.split(self.sep)
-                z = result
-                for x in ks[:-1]:
-                    if x not in z:
-                        z[x] = record()
-                    z = z[x]
-                z[ks[-1]] = v
-            else:
-                result[suffix] = v
-        if len(result) == 0:
-            raise KeyError("No key or prefix: %s" % key)
+        prefixes = self.__prefixes
+        if prefixes is not None and key in prefixes:
+            return prefixes[key]
+        result = self.__load_prefix(key)
+        if prefixes is None:
+            prefixes = {}
+            dict.__setattr__(self, '_Record__prefixes', prefixes)
+        prefixes[key] = result
+        dict.__setattr__(result, '_Record__owner', (self, key))
         return result
-    
+
+    def __load_prefix(self, key):
+        trie = self.__trie
+        if trie is None:
+            trie = {}
+            for k, v in self.iteritems():
+                if self.sep not in k:
+                    continue
+                node = trie
+                ks = k.split(self.sep)
+                for x in ks[:-1]:
+                    node = node.setdefault(x, [_MISSING, {}])[1]
+                node.setdefault(ks[-1], [_MISSING, {}])[0] = v
+            dict.__setattr__(self, '_Record__trie', trie)
+        node = trie
+        for x in key.split(self.sep):
+            entry = node.get(x)
+            if entry is None:
+                node = None
+                break
+            node = entry[1]
+        if not node:
+            raise KeyError("No key or prefix: %s" % (key + self.sep))
+        return _trie_record(node)
+
+    def __forget(self):
+        dict.__setattr__(self, '_Record__trie', None)
+        dict.__setattr__(self, '_Record__prefixes', None)
+        owner = self.__owner
+        if owner is not None:
+            dict.__setattr__(self, '_Record__owner', None)
+            parent, key = owner
+            prefixes = parent.__prefixes
+            if prefixes is not None and prefixes.get(key) is self:
+                del prefixes[key]
+            elif parent.__owner is not None:
+                # Nested in a record returned for a prefix
+                parent.__forget()
+
+    def __setitem__(self, key, value):
+        if self.__owner is not None or self.__trie is not None:
+            self.__forget()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if self.__owner is not None or self.__trie is not None:
+            self.__forget()
+        dict.__delitem__(self, key)
+
+    def __getstate__(self):
+        # The caches are not part of the record's value
+        return None
+
+    def clear(self):
+        self.__forget()
+        dict.clear(self)
+
+    def pop(self, *args):
+        self.__forget()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.__forget()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self.__forget()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self.__forget()
+        dict.update(self, *args, **kwargs)
+
+# Marks a trie node for a prefix that is not itself a key
+_MISSING = object()
+
+# Builds the nested record for the keys below a trie node. Where a key is
+# also the prefix of other keys, the key's value wins.
+def _trie_record(node):
+    result = record()
+    for x, (value, children) in node.iteritems():
+        if value is not _MISSING:
+            dict.__setitem__(result, x, value)
+        else:
+            child = _trie_record(children)
+            dict.__setattr__(child, '_Record__owner', (result, x))
+            dict.__setitem__(result, x, child)
+    return result
 
 def record(value=None): 
     """This function returns a :class:`Record` instance constructed with an 
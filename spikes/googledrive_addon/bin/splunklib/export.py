@@ -0,0 +1,446 @@
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The **splunklib.export** module streams the results of an export search
+to files on disk.
+
+:meth:`splunklib.client.Jobs.export` returns the raw response stream of a
+search. :class:`Exporter` reads that stream one result at a time and writes
+the results to a series of rotated, optionally gzip-compressed, newline
+delimited JSON or CSV files, without holding more than a bounded number of
+results in memory::
+
+    import splunklib.client as client
+    from splunklib.export import Exporter
+    service = client.connect(...)
+    exporter = Exporter(service, "/data/extracts", prefix="audit")
+    stats = exporter.export("search index=pas",
+                            earliest_time="-1d@d", latest_time="@d")
+    print "%d results in %d files at %.0f results/s" % (
+        stats.results, len(stats.files), stats.results_per_second)
+
+Results are parsed on the calling thread and compressed and written on a
+second one. The two are connected by a bounded queue: when the disk falls
+behind, the queue fills, the calling thread stops reading, and the server is
+slowed down by TCP flow control rather than by buffering results in memory.
+
+If the connection drops, the search is run again and the results already
+written are skipped, either by counting them (``resume="offset"``) or by
+restarting the search at the ``_time`` of the last result written
+(``resume="time"``, the default, for searches that return events in
+descending time order). Restarting at a time sets ``latest_time``, which
+time modifiers in the query itself, such as ``latest=@d``, would override,
+so searches that contain them are resumed by counting instead.
+"""
+
+import calendar
+import csv
+import gzip
+import httplib
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import Queue
+
+from results import JSONResultsReader
+
+__all__ = [
+    "Exporter",
+    "ExportStats",
+    "ExportError"
+]
+
+# Time modifiers in a query take precedence over the latest_time argument
+_TIME_MODIFIER = re.compile(r"(?<![\w.])(?:_index_)?(?:earliest|latest|starttimeu?|endtimeu?)\s*=",
+                            re.IGNORECASE)
+
+class ExportError(Exception):
+    """Raised when an export cannot be completed.
+
+    :ivar stats: The :class:`ExportStats` of the export so far, counting only
+        the results in complete files, or ``None``.
+    """
+    stats = None
+
+class ExportStats(object):
+    """Counts what an :class:`Exporter` did and how fast.
+
+    :ivar results: The number of results written.
+    :ivar bytes: The number of bytes of results written, before compression.
+    :ivar files: The paths of the files written, in order.
+    :ivar retries: The number of times the search was run again after the
+        connection dropped.
+    :ivar elapsed: The number of seconds the export took.
+    """
+    def __init__(self):
+        self.results = 0
+        self.bytes = 0
+        self.files = []
+        self.retries = 0
+        self.elapsed = 0.0
+
+    @property
+    def results_per_second(self):
+        """The throughput of the export, in results per second."""
+        return self.results / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_second(self):
+        """The throughput of the export, in uncompressed bytes per second."""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return "ExportStats(results=%d, bytes=%d, files=%d, retries=%d, elapsed=%.3f, results_per_second=%.0f)" % (
+            self.results, self.bytes, len(self.files), self.retries,
+            self.elapsed, self.results_per_second)
+
+# Exceptions that mean the connection to the server dropped mid-export
+_CONNECTION_ERRORS = (socket.error, httplib.HTTPException, IOError)
+
+_TIME_PATTERN = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(\.\d+)?(Z|([+-])(\d\d):?(\d\d))?$")
+
+def _epoch(value):
+    """Converts the ``_time`` of a result, an ISO 8601 timestamp or a number
+    of seconds, to seconds since the epoch."""
+    match = _TIME_PATTERN.match(value)
+    if match is None:
+        return float(value)
+    fields = [int(field) for field in match.group(1, 2, 3, 4, 5, 6)]
+    seconds = calendar.timegm(fields) + float(match.group(7) or 0)
+    if match.group(9) is not None:
+        offset = int(match.group(10)) * 3600 + int(match.group(11)) * 60
+        seconds -= offset if match.group(9) == "+" else -offset
+    return seconds
+
+def _csv_value(value):
+    if isinstance(value, list):
+        value = "\n".join(value)
+    if isinstance(value, unicode):
+        value = value.encode("utf-8")
+    return value
+
+class _RotatingFileWriter(object):
+    """Writes results to a numbered series of files, starting a new file when
+    the current one reaches a size or result count.
+
+    Each file is written under a ``.part`` name and renamed when it is
+    complete, so that a file with its final name is never partially written.
+    Numbering continues after the files of the same series already in the
+    directory, so that an export resumed by offset keeps what the earlier run
+    wrote.
+    """
+    def __init__(self, directory, prefix, output_mode, compress,
+                 max_file_size, max_file_results, fields, stats):
+        self.directory = directory
+        self.prefix = prefix
+        self.output_mode = output_mode
+        self.compress = compress
+        self.max_file_size = max_file_size
+        self.max_file_results = max_file_results
+        self.fields = fields
+        self.stats = stats
+        self._file = None
+        self._path = None
+        self._csv_fields = None
+        self._csv_buffer = None
+        self._csv_writer = None
+        self._file_bytes = 0
+        self._file_results = 0
+        self._file_result_bytes = 0
+        self._sequence = self._first_sequence()
+
+    def write(self, results):
+        for result in results:
+            if self._file is None:
+                self._open(result)
+            if self.output_mode == "csv":
+                line = self._csv_line(result)
+            else:
+                line = json.dumps(result, separators=(",", ":")) + "\n"
+            self._file.write(line)
+            self._file_bytes += len(line)
+            self._file_results += 1
+            self._file_result_bytes += len(line)
+            self.stats.results += 1
+            self.stats.bytes += len(line)
+            if self._file_bytes >= self.max_file_size or \
+                    (self.max_file_results is not None and
+                     self._file_results >= self.max_file_results):
+                self.close()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.rename(self._path + ".part", self._path)
+        self.stats.files.append(self._path)
+
+    def abort(self):
+        """Deletes the file being written, after the export failed, and stops
+        counting its results as written."""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        finally:
+            self._file = None
+            self.stats.results -= self._file_results
+            self.stats.bytes -= self._file_result_bytes
+            os.remove(self._path + ".part")
+
+    def _extension(self):
+        extension = ".csv" if self.output_mode == "csv" else ".json"
+        if self.compress:
+            extension += ".gz"
+        return extension
+
+    def _first_sequence(self):
+        pattern = re.compile(re.escape(self.prefix) + r"-(\d+)" + re.escape(self._extension()) + "$")
+        numbers = [int(match.group(1)) for match in
+                   (pattern.match(name) for name in os.listdir(self.directory))
+                   if match is not None]
+        return max(numbers) + 1 if numbers else 0
+
+    def _open(self, result):
+        self._path = os.path.join(self.directory, "%s-%05d%s" % (
+            self.prefix, self._sequence, self._extension()))
+        self._sequence += 1
+        if self.compress:
+            self._file = gzip.open(self._path + ".part", "wb", self.compress)
+        else:
+            self._file = open(self._path + ".part", "wb")
+        self._file_bytes = 0
+        self._file_results = 0
+        self._file_result_bytes = 0
+        if self.output_mode == "csv":
+            self._csv_fields = self.fields or sorted(result.iterkeys())
+            self._csv_buffer = _LineBuffer()
+            self._csv_writer = csv.writer(self._csv_buffer, lineterminator="\n")
+            header = self._csv_row([_csv_value(field) for field in self._csv_fields])
+            self._file.write(header)
+            self._file_bytes += len(header)
+
+    def _csv_line(self, result):
+        return self._csv_row(
+            [_csv_value(result.get(field, "")) for field in self._csv_fields])
+
+    def _csv_row(self, values):
+        self._csv_writer.writerow(values)
+        return self._csv_buffer.line
+
+class _LineBuffer(object):
+    """Holds the last line written to it by a ``csv.writer``."""
+    def __init__(self):
+        self.line = ""
+
+    def write(self, line):
+        self.line = line
+
+class Exporter(object):
+    """Streams the results of export searches to rotated files on disk.
+
+    Files are named ``<prefix>-00000.json.gz``, ``<prefix>-00001.json.gz``,
+    and so on, in *directory*. Each holds one result per line, as a JSON
+    object or, with ``output_mode="csv"``, as a CSV row under a header.
+    Numbering continues after the files with the same prefix already in
+    *directory*, which are never overwritten. A file is only given its name
+    once it is complete; the file an export was writing when it failed is
+    deleted.
+
+    :param service: The :class:`splunklib.client.Service` to search.
+    :param directory: The directory to write files to. It must exist.
+    :type directory: ``string``
+    :param prefix: The prefix of the file names.
+    :type prefix: ``string``
+    :param output_mode: ``"json"`` for newline delimited JSON, or ``"csv"``.
+    :type output_mode: ``string``
+    :param compress: The gzip compression level, 1 to 9, or 0 to write
+        uncompressed files.
+    :type compress: ``integer``
+    :param max_file_size: The number of uncompressed bytes after which a new
+        file is started.
+    :type max_file_size: ``integer``
+    :param max_file_results: The number of results after which a new file is
+        started (optional).
+    :type max_file_results: ``integer``
+    :param fields: The columns of CSV files. By default, each file has the
+        fields of its first result as columns, and fields that other results
+        add are left out.
+    :type fields: ``list``
+    :param queue_size: The number of batches of results that may wait to be
+        written.
+    :type queue_size: ``integer``
+    :param resume: How to continue after the connection drops: ``"time"``,
+        ``"offset"``, or ``None`` to raise :class:`ExportError`. Queries
+        with time modifiers of their own are resumed by ``"offset"``; pass
+        the time range as ``earliest_time`` and ``latest_time`` instead.
+    :type resume: ``string``
+    :param max_retries: The number of times to run the search again.
+    :type max_retries: ``integer``
+    """
+    _batch_size = 500
+
+    def __init__(self, service, directory, prefix="export", output_mode="json",
+                 compress=6, max_file_size=1 << 30, max_file_results=None,
+                 fields=None, queue_size=64, resume="time", max_retries=3):
+        if output_mode not in ("json", "csv"):
+            raise ValueError("output_mode must be 'json' or 'csv', not %r" % output_mode)
+        if resume not in ("time", "offset", None):
+            raise ValueError("resume must be 'time', 'offset', or None, not %r" % resume)
+        self.service = service
+        self.directory = directory
+        self.prefix = prefix
+        self.output_mode = output_mode
+        self.compress = compress
+        self.max_file_size = max_file_size
+        self.max_file_results = max_file_results
+        self.fields = fields
+        self.queue_size = queue_size
+        self.resume = resume
+        self.max_retries = max_retries
+
+    def export(self, query, offset=0, **params):
+        """Runs *query* as an export search and writes its results to disk.
+
+        :param query: The search query.
+        :type query: ``string``
+        :param offset: The number of results to skip, for instance to
+            continue an export that an earlier process did not finish.
+        :type offset: ``integer``
+        :param params: Additional arguments for
+            :meth:`splunklib.client.Jobs.export` (optional).
+        :type params: ``dict``
+        :raises ExportError: Raised if the connection drops and the export
+            cannot be resumed. Its ``stats`` count the results in complete
+            files, so the export can be continued with an *offset* of
+            *offset* plus ``stats.results``.
+        :return: An :class:`ExportStats` describing the export.
+        """
+        stats = ExportStats()
+        start = time.time()
+        writer = _RotatingFileWriter(
+            self.directory, self.prefix, self.output_mode, self.compress,
+            self.max_file_size, self.max_file_results, self.fields, stats)
+        queue = Queue.Queue(self.queue_size)
+        failure = []
+        complete = []
+
+        def write():
+            try:
+                while True:
+                    batch = queue.get()
+                    if batch is None:
+                        break
+                    writer.write(batch)
+                if complete:
+                    writer.close()
+                else:
+                    writer.abort()
+            except Exception as e:
+                failure.append(e)
+                try:
+                    writer.abort()
+                except Exception:
+                    logging.exception("Could not delete the partial export file.")
+                # Keep draining the queue so that the reading thread never
+                # blocks on a writer that has stopped.
+                while queue.get() is not None:
+                    pass
+
+        thread = threading.Thread(target=write, name="Exporter")
+        thread.daemon = True
+        thread.start()
+
+        try:
+            self._read(query, offset, params, queue, failure, stats)
+            complete.append(True)
+        except ExportError as e:
+            e.stats = stats
+            raise
+        finally:
+            queue.put(None)
+            thread.join()
+            stats.elapsed = time.time() - start
+        if failure:
+            raise failure[0]
+        logging.info("Exported %s", stats)
+        return stats
+
+    def _read(self, query, offset, params, queue, failure, stats):
+        params = dict(params)
+        skip = offset           # Results of the current run to skip
+        total = 0               # Results handed to the writer
+        last_time = None        # _time of the last result handed over
+        at_last_time = 0        # Results handed over with that _time
+        resume = self.resume
+        if resume == "time" and _TIME_MODIFIER.search(query):
+            logging.info("Query has its own time modifiers; resuming by offset.")
+            resume = "offset"
+        attempt = 0
+
+        while True:
+            batch = []
+            try:
+                stream = self.service.jobs.export(query, output_mode="json", **params)
+                reader = JSONResultsReader(stream)
+                for result in reader:
+                    if not isinstance(result, dict) or reader.is_preview:
+                        continue
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    if resume == "time":
+                        if "_time" in result:
+                            result_time = _epoch(result["_time"])
+                            if result_time == last_time:
+                                at_last_time += 1
+                            else:
+                                last_time, at_last_time = result_time, 1
+                        else:
+                            # Without _time there is nothing to restart the
+                            # search from, so fall back to counting results.
+                            resume = "offset"
+                    batch.append(result)
+                    total += 1
+                    if len(batch) == self._batch_size:
+                        queue.put(batch)
+                        batch = []
+                        if failure:
+                            return
+                queue.put(batch)
+                return
+            except _CONNECTION_ERRORS + (ValueError,) as e:
+                queue.put(batch)
+                if resume is None or attempt == self.max_retries:
+                    raise ExportError("Export failed after %d results: %s" % (total, e))
+                attempt += 1
+                stats.retries += 1
+                logging.warning("Export connection dropped after %d results (%s); "
+                                "resuming, attempt %d of %d",
+                                total, e, attempt, self.max_retries)
+                time.sleep(min(2 ** attempt, 30))
+                if resume == "time" and last_time is not None:
+                    # latest_time is exclusive, so search up to just past the
+                    # last result and skip the ones already written with its
+                    # _time.
+                    params["latest_time"] = "%.6f" % (last_time + 0.000001)
+                    skip = at_last_time
+                else:
+                    skip = offset + total
@@ -0,0 +1,340 @@
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The **splunklib.futures** module runs many REST operations at once.
+
+Every call in :mod:`splunklib.binding` and :mod:`splunklib.client` blocks
+until splunkd answers, so a script that checks hundreds of saved searches
+spends most of its time waiting on one request after another.
+:class:`AsyncService` sends the same calls from a pool of worker threads
+over a shared pool of keep-alive connections, and returns a :class:`Future`
+for each one instead of its result::
+
+    import splunklib.futures as futures
+    with futures.AsyncService(host="localhost", username="admin",
+                              password="changeme", max_workers=64) as s:
+        s.login().result()
+        saved_searches = s.list(s.service.saved_searches).result()
+        jobs = futures.gather([s.dispatch(saved_search)
+                               for saved_search in saved_searches])
+        done = futures.gather([s.wait(job) for job in jobs])
+        for job, results in zip(done, futures.gather([s.results(job) for job in done])):
+            print job.sid, len(results)
+
+Futures can be waited on one at a time with :meth:`Future.result`, all
+together with :func:`gather`, or in the order they finish with
+:func:`as_completed`. Search jobs are waited on by a single
+:class:`splunklib.client.JobWaiter`, rather than by a thread per job.
+"""
+
+import threading
+import time
+
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+
+from binding import ResponseReader, pooled_handler
+from client import Future, JobWaiter, OperationError, Service
+from data import record
+from results import JSONResultsReader
+
+__all__ = [
+    "as_completed",
+    "AsyncService",
+    "Future",
+    "gather"
+]
+
+
+def as_completed(futures, timeout=None):
+    """Yields futures as they finish.
+
+    :param futures: The futures to wait for.
+    :param timeout: The longest time to wait for all of them, in seconds
+        (optional).
+    :raises OperationError: Raised if they do not all finish within
+        *timeout* seconds.
+    """
+    futures = list(futures)
+    deadline = None if timeout is None else time.time() + timeout
+    finished = deque()
+    condition = threading.Condition()
+
+    def on_done(future):
+        with condition:
+            finished.append(future)
+            condition.notify()
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    for _ in xrange(len(futures)):
+        with condition:
+            while len(finished) == 0:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise OperationError, "Operations did not finish within %s seconds." % timeout
+                condition.wait(remaining)
+            future = finished.popleft()
+        yield future
+
+
+def gather(futures, timeout=None):
+    """Waits for every future to finish and returns their results, in order.
+
+    :param futures: The futures to wait for.
+    :param timeout: The longest time to wait for all of them, in seconds
+        (optional).
+    :raises OperationError: Raised if they do not all finish within
+        *timeout* seconds.
+    :return: A list of results. If an operation raised an exception, the
+        first such exception is raised instead.
+    """
+    futures = list(futures)
+    deadline = None if timeout is None else time.time() + timeout
+    for future in futures:
+        future.exception(None if deadline is None else max(0, deadline - time.time()))
+    return [future.result() for future in futures]
+
+
+class AsyncService(object):
+    """Runs REST operations on a :class:`splunklib.client.Service`
+    concurrently, returning a :class:`Future` for each one.
+
+    Operations run on a pool of *max_workers* threads. When no *service* is
+    given, one is created from *kwargs* with a
+    :func:`splunklib.binding.pooled_handler` that keeps as many connections
+    alive, so that concurrent requests do not each pay for a new connection
+    and TLS handshake. A *service* you pass in should use such a handler too.
+
+    The methods that mirror :class:`splunklib.binding.Context` read the
+    response body on the worker thread, so the connection is back in the
+    pool before the future is done. The body of the response is then read
+    from memory.
+
+    :param service: The service to use (optional).
+    :type service: :class:`splunklib.client.Service`
+    :param max_workers: The number of operations run at once.
+    :type max_workers: ``integer``
+    :param kwargs: The arguments for :class:`splunklib.client.Service`, when
+        no *service* is given.
+    """
+    def __init__(self, service=None, max_workers=32, **kwargs):
+        if service is None:
+            kwargs.setdefault('handler', pooled_handler(max_connections=max_workers))
+            service = Service(**kwargs)
+        self.service = service
+        self.max_workers = max_workers
+        self._pool = ThreadPool(max_workers)
+        self._waiter = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the worker threads and the job waiter.
+
+        Operations that have not started are abandoned and their futures
+        never finish.
+        """
+        with self._lock:
+            waiter, self._waiter = self._waiter, None
+        if waiter is not None:
+            waiter.close()
+        self._pool.terminate()
+        self._pool.join()
+
+    def submit(self, function, *args, **kwargs):
+        """Calls *function* with *args* and *kwargs* on a worker thread.
+
+        This runs any blocking call of the SDK concurrently, for instance
+        ``s.submit(saved_search.update, cron_schedule="*/5 * * * *")``.
+
+        :return: A :class:`Future` for the value *function* returns.
+        """
+        future = Future()
+
+        def run():
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as e:
+                future._finish(exception=e)
+            else:
+                future._finish(result)
+
+        self._pool.apply_async(run)
+        return future
+
+    def login(self):
+        """Logs in to splunkd, like :meth:`splunklib.binding.Context.login`.
+
+        :return: A :class:`Future` for the service.
+        """
+        return self.submit(self.service.login)
+
+    def request(self, path_segment, **kwargs):
+        """Sends a request, like :meth:`splunklib.binding.Context.request`.
+
+        :return: A :class:`Future` for the response.
+        """
+        return self.submit(self._read, self.service.request, path_segment, **kwargs)
+
+    def get(self, path_segment, **kwargs):
+        """Sends a ``GET`` request, like :meth:`splunklib.binding.Context.get`.
+
+        :return: A :class:`Future` for the response.
+        """
+        return self.submit(self._read, self.service.get, path_segment, **kwargs)
+
+    def post(self, path_segment, **kwargs):
+        """Sends a ``POST`` request, like :meth:`splunklib.binding.Context.post`.
+
+        :return: A :class:`Future` for the response.
+        """
+        return self.submit(self._read, self.service.post, path_segment, **kwargs)
+
+    def delete(self, path_segment, **kwargs):
+        """Sends a ``DELETE`` request, like
+        :meth:`splunklib.binding.Context.delete`.
+
+        :return: A :class:`Future` for the response.
+        """
+        return self.submit(self._read, self.service.delete, path_segment, **kwargs)
+
+    def list(self, collection, pagesize=None, **kwargs):
+        """Lists the entities of a collection.
+
+        Without *pagesize*, the collection is requested at once, like
+        :meth:`splunklib.client.ReadOnlyCollection.list`. With it, pages are
+        requested concurrently, up to *max_workers* at a time, and joined in
+        order.
+
+        :param collection: The collection to list.
+        :type collection: :class:`splunklib.client.ReadOnlyCollection`
+        :param pagesize: The number of entities in each request (optional).
+        :type pagesize: ``integer``
+        :param kwargs: The arguments for
+            :meth:`splunklib.client.ReadOnlyCollection.iter`.
+        :return: A :class:`Future` for a list of entities.
+        """
+        if pagesize is None:
+            return self.submit(collection.list, **kwargs)
+        future = Future()
+
+        def run():
+            try:
+                future._finish(list(self.iter(collection, pagesize, **kwargs)))
+            except BaseException as e:
+                future._finish(exception=e)
+
+        thread = threading.Thread(target=run, name='AsyncService.list')
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def iter(self, collection, pagesize=100, offset=0, count=None, prefetch=None, **kwargs):
+        """Iterates over a collection while the following pages are requested
+        on the worker threads.
+
+        This is :meth:`splunklib.client.ReadOnlyCollection.iter` with
+        *prefetch* pages in flight, but the pages are requested on this
+        service's workers, so many collections can be listed at once without
+        starting a pool for each one.
+
+        :param collection: The collection to iterate over.
+        :type collection: :class:`splunklib.client.ReadOnlyCollection`
+        :param pagesize: The number of entities in each request.
+        :type pagesize: ``integer``
+        :param prefetch: The number of pages in flight (the default is
+            *max_workers*).
+        :type prefetch: ``integer``
+        """
+        assert pagesize > 0
+        if prefetch is None:
+            prefetch = self.max_workers
+        limit = None if count is None else offset + count
+        pages = deque()
+        next_offset = offset
+        while True:
+            while len(pages) < prefetch and (limit is None or next_offset < limit):
+                size = pagesize if limit is None else min(pagesize, limit - next_offset)
+                pages.append((size, self.submit(collection._load_page, next_offset, size, kwargs)))
+                next_offset += size
+            if len(pages) == 0:
+                return
+            size, page = pages.popleft()
+            items = page.result()
+            for item in items:
+                yield item
+            if len(items) < size:
+                return
+
+    def create_job(self, query, **kwargs):
+        """Starts a search job, like :meth:`splunklib.client.Jobs.create`.
+
+        :return: A :class:`Future` for the :class:`splunklib.client.Job`.
+        """
+        return self.submit(self.service.jobs.create, query, **kwargs)
+
+    def dispatch(self, saved_search, **kwargs):
+        """Runs a saved search, like
+        :meth:`splunklib.client.SavedSearch.dispatch`.
+
+        :return: A :class:`Future` for the :class:`splunklib.client.Job`.
+        """
+        return self.submit(saved_search.dispatch, **kwargs)
+
+    def wait(self, job):
+        """Waits for a search job to finish.
+
+        Every job is polled by the same :class:`splunklib.client.JobWaiter`,
+        with one request per round for all of them.
+
+        :param job: The job to wait for.
+        :type job: :class:`splunklib.client.Job`
+        :return: A :class:`splunklib.client.JobFuture` for the job.
+        """
+        with self._lock:
+            if self._waiter is None:
+                self._waiter = JobWaiter(self.service)
+            waiter = self._waiter
+        return waiter.add(job)
+
+    def results(self, job, **kwargs):
+        """Reads the results of a finished search job.
+
+        :param job: The job to read the results of.
+        :type job: :class:`splunklib.client.Job`
+        :param kwargs: The arguments for :meth:`splunklib.client.Job.results`.
+            The results are always requested as JSON.
+        :return: A :class:`Future` for a list of result ``dict`` objects and
+            :class:`splunklib.results.Message` objects.
+        """
+        kwargs['output_mode'] = 'json'
+        kwargs.setdefault('count', 0)
+        return self.submit(lambda: list(JSONResultsReader(job.results(**kwargs))))
+
+    @staticmethod
+    def _read(method, *args, **kwargs):
+        response = method(*args, **kwargs)
+        body = response.body.read()
+        return record({
+            'status': response.status,
+            'reason': response.reason,
+            'headers': response.headers,
+            'body': ResponseReader(StringIO(body))})
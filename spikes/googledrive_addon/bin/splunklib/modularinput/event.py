@@ -17,6 +17,26 @@ try:
 except ImportError as ie:
     import xml.etree.ElementTree as ET
 
+def _escape_text(value):
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def _escape_attribute(value):
+    return _escape_text(value).replace("\"", "&quot;").replace("\n", "&#10;")
+
+# Templates for the parts of an <event> element, in the order ElementTree
+# writes them.
+_EVENT_START = '<event stanza="%s" unbroken="%d">'
+_EVENT_START_NO_STANZA = '<event unbroken="%d">'
+_EVENT_ELEMENTS = [(field, "<%s>" % tag, "</%s>" % tag) for field, tag in [
+    ("source", "source"),
+    ("sourceType", "sourcetype"),
+    ("index", "index"),
+    ("host", "host"),
+    ("data", "data")
+]]
+_EVENT_DONE = "<done />"
+_EVENT_END = "</event>"
+
 class Event(object):
     """Represents an event or fragment of an event to be written by this modular input to Splunk.
 
@@ -104,4 +124,42 @@ class Event(object):
             ET.SubElement(event, "done")
 
         stream.write(ET.tostring(event))
-        stream.flush()
\ No newline at end of file
+        stream.flush()
+
+    def serialize(self):
+        """Returns the same XML representation of self that ``write_to`` writes,
+        as a string.
+
+        This builds the XML directly from string templates rather than through
+        ``ElementTree``, which makes it much cheaper when writing many events.
+        The ``Event`` object must have its data field defined, otherwise a
+        ``ValueError`` is raised.
+        """
+        if self.data is None:
+            raise ValueError("Events must have at least the data field set to be written to XML.")
+
+        if self.stanza is not None:
+            parts = [_EVENT_START % (_escape_attribute(self.stanza), int(self.unbroken))]
+        else:
+            parts = [_EVENT_START_NO_STANZA % int(self.unbroken)]
+
+        if self.time is not None:
+            parts.append("<time>%s</time>" % _escape_text(str(self.time)))
+
+        for field, start_tag, end_tag in _EVENT_ELEMENTS:
+            value = getattr(self, field)
+            if value is not None:
+                parts.append(start_tag)
+                parts.append(_escape_text(value))
+                parts.append(end_tag)
+
+        if self.done is not None:
+            parts.append(_EVENT_DONE)
+        parts.append(_EVENT_END)
+
+        xml = "".join(parts)
+        if isinstance(xml, unicode):
+            # Match ElementTree, which writes non-ASCII characters as
+            # character references.
+            xml = xml.encode("ascii", "xmlcharrefreplace")
+        return xml
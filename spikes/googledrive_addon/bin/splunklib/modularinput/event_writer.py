@@ -13,6 +13,7 @@
 # under the License.
 
 import sys
+import time
 
 from splunklib.modularinput.event import ET
 
@@ -81,4 +82,91 @@ class EventWriter(object):
 
     def close(self):
         """Write the closing </stream> tag to make this XML well formed."""
-        self._out.write("</stream>")
\ No newline at end of file
+        self._out.write("</stream>")
+
+
+class BufferedEventWriter(EventWriter):
+    """``BufferedEventWriter`` is an ``EventWriter`` that collects serialized
+    events in memory and writes them to Splunk in batches.
+
+    Events are serialized with :meth:`Event.serialize` instead of
+    ``ElementTree``, and the batch is written out once it holds
+    *max_buffer_size* bytes or the oldest buffered event is more than
+    *max_buffer_time* seconds old when the next one is written. Call
+    :meth:`flush` to write buffered events immediately, for example before
+    a long pause between events; :meth:`close` flushes anything left.
+
+    To use it from a modular input, pass it to ``Script.run_script``::
+
+        def run(self, args):
+            return self.run_script(args, BufferedEventWriter(), sys.stdin)
+    """
+
+    def __init__(self, output = sys.stdout, error = sys.stderr,
+                 max_buffer_size = 64 * 1024, max_buffer_time = 1.0):
+        """
+        :param output: Where to write the output; defaults to sys.stdout.
+        :param error: Where to write any errors; defaults to sys.stderr.
+        :param max_buffer_size: Number of bytes of events to buffer before
+            they are written out; defaults to 64 KB.
+        :param max_buffer_time: Number of seconds an event may be buffered
+            before it is written out; defaults to 1 second.
+        """
+        EventWriter.__init__(self, output, error)
+        self._max_buffer_size = max_buffer_size
+        self._max_buffer_time = max_buffer_time
+        self._buffer = []
+        self._buffer_size = 0
+        self._buffer_start = None
+        self._closed = False
+
+    def write_event(self, event):
+        """Buffers an ``Event`` object to be written to Splunk.
+
+        :param event: An ``Event`` object.
+        """
+
+        if not self.header_written:
+            self._buffer.append("<stream>")
+            self.header_written = True
+
+        xml = event.serialize()
+        self._buffer.append(xml)
+        self._buffer_size += len(xml)
+
+        now = time.time()
+        if self._buffer_start is None:
+            self._buffer_start = now
+        if self._buffer_size >= self._max_buffer_size or \
+                now - self._buffer_start >= self._max_buffer_time:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered events to Splunk."""
+        if self._buffer:
+            self._out.write("".join(self._buffer))
+            self._buffer = []
+            self._buffer_size = 0
+            self._buffer_start = None
+        self._out.flush()
+
+    def write_xml_document(self, document):
+        """Writes a string representation of an
+        ``ElementTree`` object to the output stream, after any buffered events.
+
+        :param document: An ``ElementTree`` object.
+        """
+        self.flush()
+        EventWriter.write_xml_document(self, document)
+
+    def close(self):
+        """Write any buffered events and the closing </stream> tag to make this
+        XML well formed. Closing it again does nothing."""
+        if self._closed:
+            return
+        self._closed = True
+        if not self.header_written:
+            self._buffer.append("<stream>")
+            self.header_written = True
+        self._buffer.append("</stream>")
+        self.flush()
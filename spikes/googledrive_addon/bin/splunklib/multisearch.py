@@ -0,0 +1,285 @@
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The **splunklib.multisearch** module runs a set of related searches
+together and returns the results of each one separately.
+
+Dashboards often show several panels whose searches differ only by a filter,
+such as::
+
+    tag=keycard building_name="Building 1" | timechart count span=24h
+    tag=keycard building_name="Building 2" | timechart count span=24h
+
+Run one at a time, each of these scans the same events. :class:`MultiSearch`
+rewrites them into a single base search that matches the events of all of
+them, ``tag=keycard ((building_name="Building 1") OR (building_name="Building
+2"))``, and reads the results of each original search by post-processing the
+results of the base search, the way a dashboard does. splunkd scans the
+events once, and every result is read from the same job, over a single
+connection if the service uses :func:`splunklib.binding.pooled_handler`::
+
+    import splunklib.client as client
+    from splunklib.multisearch import MultiSearch
+    service = client.connect(...)
+    searches = MultiSearch(service, [
+        ("building%d" % n,
+         'tag=keycard building_name="Building %d" | timechart count span=24h' % n)
+        for n in range(1, 5)], earliest_time="-24h@h", latest_time="now")
+    for name, results in searches:
+        for result in results:
+            print name, result
+
+Searches that cannot be rewritten, because they do not start with a plain
+search or have nothing in common, are dispatched together as separate jobs,
+and their results are returned in the same way.
+"""
+
+import logging
+
+try:
+    from collections import OrderedDict  # must be python 2.7
+except ImportError:
+    from ordereddict import OrderedDict  # must be python 2.6
+
+from data import record
+from results import JSONResultsReader
+
+__all__ = [
+    "MultiSearch",
+    "plan"
+]
+
+# Search terms that set the time range. Searches can only share a base search
+# if they agree on these.
+_TIME_MODIFIERS = ("earliest", "latest", "_index_earliest", "_index_latest",
+                   "starttime", "endtime", "starttimeu", "endtimeu")
+
+
+def _split(text, is_separator):
+    # Splits *text* at the characters for which *is_separator* is true, except
+    # inside double quotes, parentheses, and square brackets (subsearches).
+    pieces, current = [], []
+    depth, quoted, escaped = 0, False, False
+    for c in text:
+        if quoted:
+            current.append(c)
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                quoted = False
+            continue
+        if c == '"':
+            quoted = True
+        elif c in '([':
+            depth += 1
+        elif c in ')]':
+            depth = max(0, depth - 1)
+        elif depth == 0 and is_separator(c):
+            pieces.append(''.join(current))
+            current = []
+            continue
+        current.append(c)
+    pieces.append(''.join(current))
+    return pieces
+
+
+def _parse(query):
+    # Returns the terms of the initial search command of *query* and the
+    # commands that follow it, or None if *query* does not start with a
+    # search that can be split into terms.
+    commands = [command.strip() for command in _split(query.strip(), lambda c: c == '|')]
+    base = commands[0]
+    if not base:
+        return None  # A generating command, such as | inputlookup
+    if base.split(None, 1)[0] == 'search':
+        base = base[len('search'):].strip()
+    terms = [term for term in _split(base, lambda c: c.isspace()) if term]
+    for term in terms:
+        if term in ('OR', 'NOT') or term.startswith('NOT('):
+            return None  # Dropping common terms would change the meaning
+    return terms, commands[1:]
+
+
+def _is_time_modifier(term):
+    return term.split('=', 1)[0].lower() in _TIME_MODIFIERS
+
+
+def plan(searches):
+    """Works out how to run *searches* as one base search and a post-process
+    search for each.
+
+    The base search is made of the terms that every search starts with,
+    followed by the other terms of each search joined with ``OR``. The
+    post-process search of each search is its own remaining terms, as a
+    ``search`` command, followed by the rest of its pipeline.
+
+    :param searches: The searches, as ``(name, query)`` pairs.
+    :return: A record with the fields ``base`` (the base search) and
+        ``post_process`` (a dictionary from the name of each search to its
+        post-process search, or ``None`` when it needs none), or ``None`` if
+        the searches cannot share a base search.
+    """
+    searches = list(searches)
+    if len(searches) < 2:
+        return None
+    parsed = []
+    for name, query in searches:
+        parts = _parse(query)
+        if parts is None:
+            return None
+        parsed.append((name, parts[0], parts[1]))
+    common = [term for term in parsed[0][1]
+              if all(term in terms for _, terms, _ in parsed[1:])]
+    if len(common) == 0:
+        return None
+    filters = []
+    post_process = OrderedDict()
+    for name, terms, commands in parsed:
+        rest = [term for term in terms if term not in common]
+        if any(_is_time_modifier(term) for term in rest):
+            return None
+        if rest:
+            filters.append(' '.join(rest))
+            commands = ['search ' + ' '.join(rest)] + commands
+        else:
+            filters.append(None)
+        post_process[name] = ' | '.join(commands) or None
+    base = ' '.join(common)
+    if None not in filters:
+        unique = list(OrderedDict.fromkeys(filters))
+        base += ' (' + ' OR '.join('(%s)' % f for f in unique) + ')'
+    return record({'base': base, 'post_process': post_process})
+
+
+class MultiSearch(object):
+    """Runs several searches together and returns the results of each.
+
+    When the searches can share a base search (see :func:`plan`), the base
+    search is dispatched as one job and the results of each search are read
+    from it with a post-process search. Otherwise each search is dispatched
+    as its own job, all of them before waiting for any. In both cases, jobs
+    are waited on together with :meth:`splunklib.client.Jobs.wait`.
+
+    A base search that matches events keeps at most *max_events* of them for
+    post-processing. If it matches more, the post-processed results would be
+    incomplete, so the searches are run as separate jobs instead.
+
+    :param service: The :class:`splunklib.client.Service` to search.
+    :param searches: The searches, as ``(name, query)`` pairs or a dictionary.
+    :param rewrite: Whether to try sharing a base search (the default is
+        ``True``).
+    :type rewrite: ``boolean``
+    :param max_events: The number of events a base search may keep.
+    :type max_events: ``integer``
+    :param params: Parameters for every job, such as ``earliest_time``, as
+        for :meth:`splunklib.client.Jobs.create`.
+    """
+    def __init__(self, service, searches, rewrite=True, max_events=1000000, **params):
+        if isinstance(searches, dict):
+            searches = searches.items()
+        self.service = service
+        self.searches = OrderedDict(searches)
+        self.max_events = max_events
+        self.params = params
+        self.plan = plan(self.searches.iteritems()) if rewrite else None
+        self._jobs = None  # name -> (job, post-process search)
+        self._finished = False
+
+    def __iter__(self):
+        for name in self.searches:
+            yield name, self.results(name)
+
+    def dispatch(self):
+        """Dispatches the jobs, if they have not been dispatched.
+
+        :return: The :class:`MultiSearch`.
+        """
+        if self._jobs is not None:
+            return self
+        if self.plan is not None:
+            params = dict(self.params)
+            # Post-process searches filter on fields of the base results, so
+            # every field has to be extracted.
+            params.setdefault('adhoc_search_level', 'verbose')
+            params['max_count'] = self.max_events
+            job = self.service.jobs.create(self.plan.base, **params)
+            self._jobs = OrderedDict((name, (job, post_process))
+                                     for name, post_process in self.plan.post_process.iteritems())
+        else:
+            self._dispatch_separately()
+        return self
+
+    def wait(self, timeout=None):
+        """Waits for the jobs to finish, dispatching them first if needed.
+
+        :param timeout: The longest time to wait, in seconds (optional).
+        :type timeout: ``float``
+        :raises OperationError: Raised if the jobs do not finish within
+            *timeout* seconds.
+        :return: The :class:`MultiSearch`.
+        """
+        if self._finished:
+            return self
+        self.dispatch()
+        jobs = self._unique_jobs()
+        self.service.jobs.wait(jobs, timeout)
+        if self.plan is not None and int(jobs[0]['eventCount']) >= self.max_events:
+            logging.warning("Base search matched %s events, reaching its limit of %d; "
+                            "running %d searches separately.",
+                            jobs[0]['eventCount'], self.max_events, len(self.searches))
+            jobs[0].cancel()
+            self._dispatch_separately()
+            self.service.jobs.wait(self._unique_jobs(), timeout)
+        self._finished = True
+        return self
+
+    def results(self, name, **kwargs):
+        """Returns the results of one of the searches, once the jobs have
+        finished.
+
+        :param name: The name of the search.
+        :param kwargs: Parameters for :meth:`splunklib.client.Job.results`
+            (optional). The results are always read as JSON.
+        :return: An iterator over result ``dict`` objects and
+            :class:`splunklib.results.Message` objects, as returned by
+            :class:`splunklib.results.JSONResultsReader`.
+        """
+        if name not in self.searches:
+            raise KeyError(name)
+        self.wait()
+        job, post_process = self._jobs[name]
+        kwargs['output_mode'] = 'json'
+        kwargs.setdefault('count', 0)
+        if post_process is not None:
+            kwargs['search'] = post_process
+        return JSONResultsReader(job.results(**kwargs))
+
+    def cancel(self):
+        """Cancels the jobs."""
+        if self._jobs is not None:
+            for job in self._unique_jobs():
+                job.cancel()
+
+    def _dispatch_separately(self):
+        self.plan = None
+        self._jobs = OrderedDict((name, (self.service.jobs.create(query, **self.params), None))
+                                 for name, query in self.searches.iteritems())
+
+    def _unique_jobs(self):
+        jobs = OrderedDict()
+        for job, _ in self._jobs.itervalues():
+            jobs[job.sid] = job
+        return jobs.values()
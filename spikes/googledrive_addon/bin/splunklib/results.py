@@ -30,8 +30,16 @@ as follows:::
     for item in reader:
         print(item)
     print "Results are a preview: %s" % reader.is_preview
+
+Parsing XML is comparatively slow. For large result sets, request the results
+with ``output_mode="json"`` or ``output_mode="csv"`` and read them with
+:class:`JSONResultsReader` or :class:`CSVResultsReader`, which iterate the same
+way but parse several times faster.
 """
 
+import csv
+import json
+
 try:
     import xml.etree.cElementTree as et
 except:
@@ -49,6 +57,8 @@ except:
 
 __all__ = [
     "ResultsReader",
+    "JSONResultsReader",
+    "CSVResultsReader",
     "Message"
 ]
 
@@ -263,6 +273,228 @@ class ResultsReader(object):
             else:
                 raise
 
+# Number of bytes read from the stream at a time by the JSON and CSV readers.
+_CHUNK_SIZE = 64 * 1024
+
+class _JSONScanner(object):
+    """Decodes a stream of JSON values a piece at a time.
+
+    Only as much of the stream is buffered as is needed to decode the value
+    at hand, so a document with an arbitrarily long array can be walked one
+    element at a time.
+    """
+    _whitespace = " \t\n\r"
+
+    def __init__(self, stream, chunk_size=_CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character, or "" at the end
+        of the stream."""
+        while True:
+            while self._pos < len(self._buffer) and \
+                    self._buffer[self._pos] in self._whitespace:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, c):
+        """Consumes the character *c*, raising ``ValueError`` if the stream
+        has something else next."""
+        found = self.peek()
+        if found != c:
+            raise ValueError("Expected %r in JSON results, found %r" % (c, found))
+        self._pos += 1
+
+    def value(self):
+        """Decodes and consumes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A value that runs up to the end of the buffer may be
+                # truncated (a number, for instance), so only trust it if
+                # something follows it or the stream is exhausted.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._fill()
+
+class JSONResultsReader(object):
+    """This class returns dictionaries and Splunk messages from a JSON results
+    stream, that is, results requested with ``output_mode="json"``.
+
+    ``JSONResultsReader`` iterates like :class:`ResultsReader`: it returns a
+    ``dict`` for each result and a :class:`Message` for each Splunk message,
+    and sets ``is_preview`` once the stream says whether the results are a
+    preview. It reads both the single document returned by
+    :meth:`splunklib.client.Job.results` and the sequence of documents
+    streamed by :meth:`splunklib.client.Jobs.export`, one result at a time.
+
+    Unlike ``ResultsReader``, result values are ``unicode`` strings (or lists
+    of them for multivalued fields), and results are plain ``dict`` objects.
+
+    :param `stream`: The stream to read from (any object that supports
+        ``.read()``).
+
+    **Example**::
+
+        import results
+        response = job.results(output_mode="json")
+        reader = results.JSONResultsReader(response)
+        for result in reader:
+            if isinstance(result, dict):
+                print "Result: %s" % result
+            elif isinstance(result, results.Message):
+                print "Message: %s" % result
+        print "is_preview = %s " % reader.is_preview
+    """
+    def __init__(self, stream):
+        self.is_preview = None
+        self._gen = self._parse_results(_JSONScanner(stream))
 
+    def __iter__(self):
+        return self
 
+    def next(self):
+        return self._gen.next()
 
+    def _parse_results(self, scanner):
+        """Parse results and messages out of *scanner*."""
+        # Each top-level object is either a whole results document
+        # ({"preview": ..., "messages": [...], "results": [...]}) or, for
+        # export, one streamed result ({"preview": ..., "result": {...}}).
+        while scanner.peek() != "":
+            scanner.expect("{")
+            while True:
+                c = scanner.peek()
+                if c == "}":
+                    scanner.expect("}")
+                    break
+                if c == ",":
+                    scanner.expect(",")
+                    continue
+                key = scanner.value()
+                scanner.expect(":")
+                if key == "preview":
+                    self.is_preview = scanner.value()
+                elif key == "result":
+                    yield scanner.value()
+                elif key in ("results", "messages") and scanner.peek() == "[":
+                    scanner.expect("[")
+                    while True:
+                        c = scanner.peek()
+                        if c == "]":
+                            scanner.expect("]")
+                            break
+                        if c == ",":
+                            scanner.expect(",")
+                            continue
+                        item = scanner.value()
+                        if key == "results":
+                            yield item
+                        else:
+                            yield Message(item["type"], item["text"])
+                else:
+                    scanner.value()
+
+def _iter_lines(stream, chunk_size=_CHUNK_SIZE):
+    """Yields the lines of *stream*, reading it a chunk at a time."""
+    remainder = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (remainder + chunk).split("\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if remainder:
+        yield remainder
+
+def _decode_multivalue(value):
+    """Decodes an ``__mv_`` column value such as ``$a$;$b$$c$`` into a list
+    of values (``["a", "b$c"]``)."""
+    values = []
+    for item in value[1:-1].split("$;$"):
+        values.append(item.replace("$$", "$"))
+    return values
+
+class CSVResultsReader(object):
+    """This class returns dictionaries from a CSV results stream, that is,
+    results requested with ``output_mode="csv"``.
+
+    ``CSVResultsReader`` iterates like :class:`ResultsReader`, returning a
+    ``dict`` for each result. Empty fields are left out of the ``dict``, and
+    multivalued fields are returned as lists using Splunk's ``__mv_`` columns.
+    The CSV format carries no messages or preview flag, so ``is_preview`` is
+    always ``None``.
+
+    :param `stream`: The stream to read from (any object that supports
+        ``.read()``).
+
+    **Example**::
+
+        import results
+        reader = results.CSVResultsReader(job.results(output_mode="csv"))
+        for result in reader:
+            print "Result: %s" % result
+    """
+    def __init__(self, stream):
+        self.is_preview = None
+        self._gen = self._parse_results(stream)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        return self._gen.next()
+
+    def _parse_results(self, stream):
+        """Parse results out of *stream*."""
+        reader = csv.reader(_iter_lines(stream))
+        try:
+            header = reader.next()
+        except StopIteration:
+            return
+        columns = []
+        multivalue_columns = []
+        names = set(header)
+        for i, name in enumerate(header):
+            if name.startswith("__mv_") and name[5:] in names:
+                multivalue_columns.append((i, name[5:]))
+            else:
+                columns.append((i, name))
+        for row in reader:
+            if row == header:
+                # Export streams repeat the header for each preview.
+                continue
+            result = {}
+            for i, name in columns:
+                if i < len(row) and row[i] != "":
+                    result[name] = row[i]
+            for i, name in multivalue_columns:
+                if i < len(row) and row[i] != "":
+                    result[name] = _decode_multivalue(row[i])
+            yield result
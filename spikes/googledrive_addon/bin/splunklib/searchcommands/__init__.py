@@ -41,6 +41,20 @@
         supports_getinfo = true
         supports_rawargs = true
 
+     or, to use the chunked search command protocol (v2), as follows:
+
+     .. code-block:: text
+        :linenos:
+
+        [commandname]
+        filename = commandname.py
+        chunked = true
+
+     Under the chunked protocol Splunk starts a command once per search rather
+     than once per batch of records, and exchanges settings, messages, and
+     records with it as a sequence of chunks on stdin and stdout. The settings
+     in notes 3-6 do not apply.
+
      No other static configuration is required or expected and may interfere with
      command execution.
 
@@ -156,6 +170,9 @@ if sys.platform == 'win32':
     import msvcrt
     import os
     msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
+    # Chunk lengths under the chunked protocol are byte counts, so stdin must
+    # not translate line endings either
+    msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
 
 def dispatch(command_class, argv=sys.argv, input_file=sys.stdin, output_file=
              sys.stdout, module_name=None):
@@ -15,6 +15,7 @@
 from __future__ import absolute_import
 
 from . import dialect
+from .batch_reader import BatchReader
 from .dict_reader import DictReader
 from .dict_writer import DictWriter
 
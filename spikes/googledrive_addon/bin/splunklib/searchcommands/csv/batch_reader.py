@@ -0,0 +1,78 @@
+# Copyright 2011-2014 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import
+
+try:
+    from collections import OrderedDict  # Python 2.7
+except ImportError:
+    from ordereddict import OrderedDict  # Python 2.6
+
+from itertools import islice, izip_longest
+import csv
+
+from .dict_reader import DictReader
+
+
+class BatchReader(object):
+    """ Splunk multi-value-aware CSV reader that produces column-oriented
+    batches of records.
+
+    Each batch is an :class:`OrderedDict` mapping field names to lists of
+    values, one value per record. Multi-value fields are decoded into lists,
+    just as they are by :class:`DictReader`.
+
+    """
+    def __init__(self, input_file, batch_size=None):
+        """
+        :param input_file: File-like object containing Splunk CSV
+        :param batch_size: Maximum number of records in a batch or
+            :const:`None`, if all records should be read into a single batch.
+
+        """
+        self.reader = csv.reader(input_file, dialect='splunklib.searchcommands')
+        self.batch_size = batch_size
+
+    def __iter__(self):
+        try:
+            fieldnames = self.reader.next()
+        except StopIteration:
+            return
+        while True:
+            rows = list(islice(self.reader, self.batch_size))
+            if len(rows) == 0:
+                return
+            yield self._make_batch(fieldnames, rows)
+
+    @staticmethod
+    def _make_batch(fieldnames, rows):
+        columns = izip_longest(*rows, fillvalue='')
+        batch = OrderedDict()
+        mv_columns = []
+        for name, column in zip(fieldnames, columns):
+            if name.startswith('__mv_'):
+                mv_columns.append((name[len('__mv_'):], column))
+            else:
+                batch[name] = list(column)
+        for name, mv_column in mv_columns:
+            column = batch.get(name)
+            if column is None:
+                continue
+            for i, mv in enumerate(mv_column):
+                if len(mv) == 0:
+                    continue
+                list_value = DictReader._decode_list(mv)
+                if list_value is not None:
+                    column[i] = list_value if len(list_value) > 1 else list_value[0]
+        return batch
@@ -13,6 +13,7 @@
 # under the License.
 
 from __future__ import absolute_import
+from itertools import izip
 import csv
 
 
@@ -37,7 +38,8 @@ class DictWriter(csv.DictWriter, object):
         self.fieldnames = _fieldnames
 
         try:
-            self._command.messages.write(self._output_file)
+            if self._command is not None:
+                self._command.messages.write(self._output_file)
             self.writer.writerow(_fieldnames)
         finally:
             self.fieldnames = save_fieldnames
@@ -53,6 +55,52 @@ class DictWriter(csv.DictWriter, object):
         for record in records:
             self._writerow(record)
 
+    def writebatch(self, batch):
+        """ Writes a column-oriented batch of records.
+
+        :param batch: Mapping from field name to a sequence of values, one per
+            record, as produced by :class:`BatchReader`. Sequences may be lists,
+            tuples, or arrays of equal length.
+
+        """
+        if self.fieldnames is None:
+            self.fieldnames = sorted(batch.iterkeys())
+        self.writeheader()
+
+        record_count = max([len(column) for column in batch.itervalues()] or [0])
+        if record_count == 0:
+            return
+
+        empty_column = [None] * record_count
+        values, multi_values = [], []
+
+        for fieldname in self.fieldnames:
+            column = batch.get(fieldname)
+            if column is None:
+                values.append(empty_column)
+                multi_values.append(empty_column)
+                continue
+            value, multi_value = self._encode_column(column, empty_column)
+            values.append(value)
+            multi_values.append(multi_value)
+
+        self.writer.writerows(izip(*(values + multi_values)))
+
+    def _encode_column(self, column, empty_column):
+        if not any(isinstance(value, (list, bool)) for value in column):
+            return column, empty_column
+        values, multi_values = [], []
+        for value in column:
+            if isinstance(value, list):
+                value, multi_value = self._encode_list(value)
+            elif isinstance(value, bool):
+                value, multi_value = int(value), None
+            else:
+                multi_value = None
+            values.append(value)
+            multi_values.append(multi_value)
+        return values, multi_values
+
     def _encode_list(self, value):
         if len(value) == 0:
             return None, None
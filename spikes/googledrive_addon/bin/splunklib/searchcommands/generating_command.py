@@ -12,7 +12,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from itertools import islice
+
 from . search_command import SearchCommand
+from . search_command_internals import read_chunk
 
 
 class GeneratingCommand(SearchCommand):
@@ -83,6 +86,20 @@ class GeneratingCommand(SearchCommand):
             self.logger.error(format_exc())
             exit(1)
 
+    def _execute_chunked(self, operation, input_file, output_file):
+        # Splunk asks for records with a sequence of execute chunks. Each is
+        # answered with up to maxresultrows records, the last with fewer and
+        # finished=True.
+        records = operation()
+        finished = False
+        while not finished:
+            chunk = read_chunk(input_file)
+            if chunk is None:
+                return
+            output = list(islice(records, self._maxresultrows))
+            finished = len(output) < self._maxresultrows or chunk[0].get('finished', False)
+            self._write_chunked_records(output_file, output, finished)
+
     def _prepare(self, argv, input_file):
         ConfigurationSettings = type(self).ConfigurationSettings
         argv = argv[2:]
@@ -167,6 +184,16 @@ class GeneratingCommand(SearchCommand):
 
         #region Methods
 
+        def chunked_settings(self):
+            """ Represents this instance as the metadata Splunk expects in reply
+            to a :code:`getinfo` chunk.
+
+            """
+            settings = super(GeneratingCommand.ConfigurationSettings, self).chunked_settings()
+            settings['generating'] = True
+            settings['type'] = 'stateful' if self.local else 'streaming'
+            return settings
+
         @classmethod
         def fix_up(cls, command):
             """ Verifies :code:`command` class structure.
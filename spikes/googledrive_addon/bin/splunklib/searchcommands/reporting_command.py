@@ -177,6 +177,20 @@ class ReportingCommand(SearchCommand):
 
         #region Methods
 
+        def chunked_settings(self):
+            """ Represents this instance as the metadata Splunk expects in reply
+            to a :code:`getinfo` chunk.
+
+            The :code:`streaming_preop` is included when the command overrides
+            :meth:`ReportingCommand.map`.
+
+            """
+            settings = super(ReportingCommand.ConfigurationSettings, self).chunked_settings()
+            settings['type'] = 'reporting'
+            if type(self.command).map != ReportingCommand.map:
+                settings['streaming_preop'] = self.streaming_preop
+            return settings
+
         @classmethod
         def fix_up(cls, command):
             """ Verifies :code:`command` class structure and configures the
@@ -23,6 +23,7 @@ try:
 except ImportError:
     from ordereddict import OrderedDict # python 2.6
 
+from cStringIO import StringIO
 from inspect import getmembers
 from logging import _levelNames, getLevelName
 from os import path
@@ -36,7 +37,7 @@ from . import csv, logging
 from .decorators import Option
 from .validators import Boolean, Fieldname
 from .search_command_internals import InputHeader, MessagesHeader, \
-    SearchCommandParser
+    SearchCommandParser, read_chunk, write_chunk
 
 
 class SearchCommand(object):
@@ -328,20 +329,177 @@ class SearchCommand(object):
 
         else:
 
-            file_name = path.basename(args[0])
-            message = (
-                'Command {0} appears to be statically configured and static '
-                'configuration is unsupported by splunklib.searchcommands. '
-                'Please ensure that default/commands.conf contains this '
-                'stanza: '
-                '[{0}] | '
-                'filename = {1} | '
-                'supports_getinfo = true | '
-                'supports_rawargs = true | '
-                'outputheader = true'.format(type(self).name, file_name))
-            self.messages.append('error_message', message)
-            self.messages.write(output_file)
-            self.logger.error(message)
+            # Splunk runs commands configured with `chunked = true` without
+            # arguments and exchanges chunks with them until they finish.
+            self._process_chunked(args, input_file, output_file)
+
+    def _process_chunked(self, args, input_file, output_file):
+        """ Processes search results using the chunked search command protocol
+        (v2).
+
+        Under this protocol Splunk starts the command once per search. It
+        sends a :code:`getinfo` chunk carrying the command arguments, which the
+        command answers with its configuration settings, and then a sequence
+        of :code:`execute` chunks carrying CSV search results, each of which
+        the command answers with a chunk of output records.
+
+        :param args: Sequence of command arguments
+        :param input_file: Pipeline input file
+        :param output_file: Pipeline output file
+
+        """
+        try:
+            chunk = read_chunk(input_file)
+        except ValueError:
+            self._write_static_configuration_error(args, output_file)
+            return
+
+        if chunk is None:
+            return
+
+        metadata, body = chunk
+        search_info = metadata.get('searchinfo', {})
+        self._maxresultrows = int(search_info.get('maxresultrows', 50000))
+
+        dispatch_dir = search_info.get('dispatch_dir')
+        if dispatch_dir is not None:
+            self.input_header._update(
+                'infoPath', path.join(dispatch_dir, 'info.csv'))
+
+        # _prepare expects arguments in the position they take on a
+        # __GETINFO__/__EXECUTE__ command line.
+        command_args = args[:1] + ['__CHUNKED__'] + search_info.get('args', [])
+        ConfigurationSettings, operation, command_args, reader = self._prepare(
+            command_args, input_file=None)
+
+        try:
+            self.parser.parse(command_args, self)
+        except (SyntaxError, ValueError) as e:
+            self.messages.append('error_message', e)
+            self._write_chunked_records(output_file, [], finished=True)
+            self.logger.error(e)
+            return
+
+        self._configuration = ConfigurationSettings(self)
+
+        if self.show_configuration:
+            self.messages.append(
+                'info_message', '%s command configuration settings: %s'
+                % (self.name, self._configuration))
+
+        settings = self._configuration.chunked_settings()
+        settings.update(self._inspector())
+        write_chunk(output_file, settings)
+
+        try:
+            self._execute_chunked(operation, input_file, output_file)
+        except Exception as e:
+            from traceback import format_exc
+            from sys import exit
+            self.logger.error(format_exc())
+            self.messages.append('error_message', e)
+            self._write_chunked_records(output_file, [], finished=True)
+            exit(1)
+
+    def _execute_chunked(self, operation, input_file, output_file):
+        """ Runs `operation` over the records carried by successive
+        :code:`execute` chunks.
+
+        `operation` sees a single stream of records that spans chunks. When it
+        asks for more records than the current chunk holds, the records it
+        has produced so far are sent in reply and the next chunk is read.
+        Streaming commands therefore answer each chunk with their output for
+        that chunk, while reporting commands see every record before they
+        answer.
+
+        Records are read from and written to chunks by :meth:`_read_chunk_body`
+        and :meth:`_write_chunked_output`, which commands that process records
+        in some other form override.
+
+        """
+        output = []
+        state = {'finished': False}
+
+        def records():
+            while not state['finished']:
+                chunk = read_chunk(input_file)
+                if chunk is None:
+                    state['finished'] = True
+                    return
+                metadata, body = chunk
+                state['finished'] = metadata.get('finished', False)
+                for record in self._read_chunk_body(body):
+                    yield record
+                if not state['finished']:
+                    self._write_chunked_output(output_file, output, finished=False)
+                    del output[:]
+
+        for record in operation(records()):
+            output.append(record)
+
+        self._write_chunked_output(output_file, output, finished=True)
+
+    def _read_chunk_body(self, body):
+        return SearchCommand.records(csv.DictReader(StringIO(body)))
+
+    def _write_chunked_output(self, output_file, output, finished):
+        self._write_chunked_records(output_file, output, finished)
+
+    def _inspector(self):
+        """ Moves the messages accumulated in :attr:`messages` into the
+        :code:`inspector` metadata of a chunk.
+
+        """
+        if len(self.messages) == 0:
+            return {}
+        levels = {
+            'debug_message': 'DEBUG', 'info_message': 'INFO',
+            'warn_message': 'WARN', 'error_message': 'ERROR'}
+        messages = [[levels[level], str(text)] for level, text in self.messages]
+        self.messages = MessagesHeader()
+        return {'inspector': {'messages': messages}}
+
+    def _write_chunked_records(self, output_file, records, finished):
+        """ Writes `records` as the CSV body of a chunk.
+
+        """
+        body = StringIO()
+        if len(records) > 0:
+            # Messages travel in the chunk metadata, not ahead of the body, and
+            # records in a chunk need not share the same set of fields.
+            fieldnames = set()
+            for record in records:
+                fieldnames.update(record.iterkeys())
+            fieldnames = sorted(fieldnames)
+            writer = csv.DictWriter(body, None, fieldnames)
+            writer.writerows(
+                [dict(dict.fromkeys(fieldnames), **record) for record in records])
+        self._write_chunked_body(output_file, body.getvalue(), finished)
+
+    def _write_chunked_body(self, output_file, body, finished):
+        metadata = {'finished': finished}
+        metadata.update(self._inspector())
+        write_chunk(output_file, metadata, body)
+
+    def _write_static_configuration_error(self, args, output_file):
+        file_name = path.basename(args[0])
+        message = (
+            'Command {0} appears to be statically configured and static '
+            'configuration is unsupported by splunklib.searchcommands. '
+            'Please ensure that default/commands.conf contains this '
+            'stanza: '
+            '[{0}] | '
+            'filename = {1} | '
+            'supports_getinfo = true | '
+            'supports_rawargs = true | '
+            'outputheader = true '
+            'or this one: '
+            '[{0}] | '
+            'filename = {1} | '
+            'chunked = true'.format(type(self).name, file_name))
+        self.messages.append('error_message', message)
+        self.messages.write(output_file)
+        self.logger.error(message)
 
     @staticmethod
     def records(reader):
@@ -589,6 +747,21 @@ class SearchCommand(object):
 
         #region Methods
 
+        def chunked_settings(self):
+            """ Represents this instance as the metadata Splunk expects in reply
+            to a :code:`getinfo` chunk under the chunked search command protocol
+            (v2).
+
+            Derived classes extend this with the :code:`type` of the command.
+
+            :return: :class:`dict` containing setting values keyed by name
+
+            """
+            required_fields = self.required_fields
+            return {
+                'required_fields': [f for f in required_fields.split(',') if f],
+                'run_in_preview': self.run_in_preview}
+
         @classmethod
         def configuration_settings(cls):
             """ Represents this class as a dictionary of :class:`property`
@@ -17,6 +17,7 @@ try:
 except ImportError:
     from ordereddict import OrderedDict  # Python 2.6
 
+import json
 import re
 import urllib2 as urllib
 
@@ -202,6 +203,60 @@ class MessagesHeader(object):
         'debug_message', 'warn_message', 'info_message', 'error_message']
 
 
+def read_chunk(input_file):
+    """ Reads a chunk of the chunked search command protocol (v2).
+
+    A chunk is a header line of the form
+
+        *chunked 1.0,<metadata-length>,<body-length>\\n*
+
+    followed by *<metadata-length>* bytes of JSON-encoded metadata and
+    *<body-length>* bytes of body, typically CSV search results.
+
+    :param input_file: File-like object positioned at the start of a chunk
+    :return: A *(metadata, body)* tuple or :const:`None`, if `input_file` is at
+        end-of-file.
+
+    #Exceptions:
+
+    ``ValueError``: `input_file` does not contain a well-formed chunk.
+
+    """
+    header = input_file.readline()
+    if len(header) == 0:
+        return None
+    match = _chunk_header_re.match(header)
+    if match is None:
+        raise ValueError('Expected a chunk header, not %s' % repr(header))
+    metadata_length, body_length = int(match.group(1)), int(match.group(2))
+    metadata = input_file.read(metadata_length)
+    body = input_file.read(body_length)
+    if len(metadata) != metadata_length or len(body) != body_length:
+        raise ValueError('Chunk ended early: %s' % repr(header))
+    metadata = json.loads(metadata) if metadata_length > 0 else {}
+    return metadata, body
+
+
+def write_chunk(output_file, metadata, body=''):
+    """ Writes a chunk of the chunked search command protocol (v2).
+
+    See :func:`read_chunk` for a description of the chunk format.
+
+    :param output_file: File-like object to write to
+    :param metadata: JSON-serializable metadata
+    :param body: Chunk body, typically CSV search results
+
+    """
+    metadata = json.dumps(metadata, separators=(',', ':'))
+    output_file.write('chunked 1.0,%d,%d\n' % (len(metadata), len(body)))
+    output_file.write(metadata)
+    output_file.write(body)
+    output_file.flush()
+
+
+_chunk_header_re = re.compile(r'chunked\s+1\.0\s*,\s*(\d+)\s*,\s*(\d+)\s*\n')
+
+
 class SearchCommandParser(object):
     """ Parses the arguments to a search command.
 
@@ -12,6 +12,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from cStringIO import StringIO
+from itertools import chain
+
 from . search_command import SearchCommand
 from . import csv
 
@@ -50,6 +53,20 @@ class StreamingCommand(SearchCommand):
         class SomeStreamingCommand(StreamingCommand):
             ...
 
+    If per-record processing is too slow, override :meth:`stream_batches`
+    instead of :meth:`stream`. Your command then receives and returns
+    column-oriented batches of records, so that a transform can be applied to
+    a whole column at once.
+
+    .. code-block:: python
+
+        @Configuration()
+        class SomeStreamingCommand(StreamingCommand):
+            def stream_batches(self, batches):
+                for batch in batches:
+                    batch['total'] = [int(x) * 2 for x in batch['count']]
+                    yield batch
+
     :ivar input_header: :class:`InputHeader`:  Collection representing the input
         header associated with this command invocation.
 
@@ -68,8 +85,36 @@ class StreamingCommand(SearchCommand):
         """
         raise NotImplementedError('StreamingCommand.stream(self, records)')
 
+    def stream_batches(self, batches):
+        """ Generator function that processes and yields column-oriented
+        batches of event records to the Splunk processing pipeline.
+
+        A batch maps field names to equal-length sequences of values, one value
+        per record. Input batches are :class:`OrderedDict` instances holding
+        lists. Output batches may hold lists, tuples, or arrays. A record
+        missing from an output batch field is written as an empty value.
+
+        Override this method instead of :meth:`stream` to process records in
+        batches. Each batch holds the records Splunk sent in a single request:
+        up to :attr:`batch_size` records under the legacy protocol and a whole
+        chunk under the chunked protocol.
+
+        """
+        raise NotImplementedError('StreamingCommand.stream_batches(self, batches)')
+
+    #: Maximum number of records in a batch passed to :meth:`stream_batches`
+    #: under the legacy protocol.
+    batch_size = 50000
+
+    def _batched(self):
+        return type(self).stream_batches != StreamingCommand.stream_batches
+
     def _execute(self, operation, reader, writer):
         try:
+            if self._batched():
+                for batch in operation(reader):
+                    writer.writebatch(batch)
+                return
             for record in operation(SearchCommand.records(reader)):
                 writer.writerow(record)
         except Exception as e:
@@ -81,11 +126,31 @@ class StreamingCommand(SearchCommand):
     def _prepare(self, argv, input_file):
         ConfigurationSettings = type(self).ConfigurationSettings
         argv = argv[2:]
-        if input_file is None:
-            reader = None
+        if self._batched():
+            operation = self.stream_batches
+            reader = None if input_file is None else csv.BatchReader(
+                input_file, self.batch_size)
         else:
-            reader = csv.DictReader(input_file)
-        return ConfigurationSettings, self.stream, argv, reader
+            operation = self.stream
+            reader = None if input_file is None else csv.DictReader(input_file)
+        return ConfigurationSettings, operation, argv, reader
+
+    def _read_chunk_body(self, body):
+        if not self._batched():
+            return super(StreamingCommand, self)._read_chunk_body(body)
+        return csv.BatchReader(StringIO(body))
+
+    def _write_chunked_output(self, output_file, output, finished):
+        if not self._batched():
+            return super(StreamingCommand, self)._write_chunked_output(
+                output_file, output, finished)
+        body = StringIO()
+        if len(output) > 0:
+            fieldnames = sorted(set(chain.from_iterable(output)))
+            writer = csv.DictWriter(body, None, fieldnames)
+            for batch in output:
+                writer.writebatch(batch)
+        self._write_chunked_body(output_file, body.getvalue(), finished)
 
     #endregion
 
@@ -151,13 +216,28 @@ class StreamingCommand(SearchCommand):
 
         #region Methods
 
+        def chunked_settings(self):
+            """ Represents this instance as the metadata Splunk expects in reply
+            to a :code:`getinfo` chunk.
+
+            Streaming commands that must run on the search head are reported
+            as :code:`stateful`.
+
+            """
+            settings = super(StreamingCommand.ConfigurationSettings, self).chunked_settings()
+            settings['type'] = 'stateful' if self.local else 'streaming'
+            return settings
+
         @classmethod
         def fix_up(cls, command):
             """ Verifies :code:`command` class structure.
 
             """
-            if command.stream == StreamingCommand.stream:
-                raise AttributeError('No StreamingCommand.stream override')
+            if command.stream == StreamingCommand.stream and \
+                    command.stream_batches == StreamingCommand.stream_batches:
+                raise AttributeError(
+                    'No StreamingCommand.stream or '
+                    'StreamingCommand.stream_batches override')
             return
 
         #endregion
@@ -8,3 +8,17 @@ action.jira.param.summary = <string>
 action.jira.param.description = <string>
 action.jira.param.issue_type = <string>
 action.jira.param.assignee = <string>
+action.jira.param.worker = [0|1]
+# With per_result = 1, write fields of each result in the summary and
+# description as ${field}; splunkd fills in $result.field$ tokens from the
+# first result.
+action.jira.param.per_result = [0|1]
+action.jira.param.group_by = <string>
+action.jira.param.max_concurrency = <integer>
+action.jira.param.dedup_fields = <string>
+# Seconds after an issue was opened during which repeats are added to it;
+# repeats do not extend it.
+action.jira.param.dedup_ttl = <integer>
+action.jira.param.dedup_action = [comment|update]
+action.jira.param.timeout = <number>
+action.jira.param.max_retries = <integer>
@@ -1,12 +1,91 @@
 import sys
 import json
+import hashlib
+import os
+import random
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+import Queue
 import urllib2
-import requests
+from collections import deque
+
+import alert_results
+import alert_templates
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# In worker mode, --execute only writes the alert payload to a spool
+# directory. A resident dispatcher process, started on demand, sends the
+# spooled payloads through one keep-alive session, several at a time, and
+# exits once it has been idle for a while.
+SPLUNK_HOME = os.environ.get('SPLUNK_HOME')
+if SPLUNK_HOME:
+    SPOOL_DIR = os.path.join(SPLUNK_HOME, 'var', 'spool', 'jira_alerts')
+    DISPATCHER_LOG = os.path.join(SPLUNK_HOME, 'var', 'log', 'splunk', 'jira_alerts_dispatcher.log')
+else:
+    # the temporary directory is shared, so each user gets a spool of their
+    # own, which spool_dirs checks nobody else can use
+    SPOOL_DIR = os.path.join(tempfile.gettempdir(), 'jira_alerts-%s' % (
+        os.getuid() if hasattr(os, 'getuid') else 'spool'))
+    DISPATCHER_LOG = os.path.join(SPOOL_DIR, 'dispatcher.log')
+DISPATCHER_LOCK = os.path.join(SPOOL_DIR, 'dispatcher.lock')
+DISPATCHER_CONCURRENCY = 8
+DISPATCHER_IDLE_TIMEOUT = 300
+DISPATCHER_POLL_INTERVAL = 0.1
+MAX_CONCURRENCY = 8
+
+# With dedup_fields set, the issue opened for an alert is remembered, keyed
+# by the values of those fields in the result, for dedup_ttl seconds after it
+# was opened. Repeat firings are gathered and added to the issue in one
+# request: a comment, or with dedup_action = update, a new summary and
+# description. An issue JIRA refuses to update, because it was deleted or
+# moved, is forgotten, so the next firing opens a new one.
+TICKET_INDEX = os.path.join(SPOOL_DIR, 'tickets.json')
+DEDUP_TTL = 86400
+DEDUP_FLUSH_INTERVAL = 5
+DEDUP_MAX_COALESCED = 50
+ISSUE_REST_PATH = "/rest/api/latest/issue"
+
+# Every request gives up after timeout seconds without an answer. A ticket
+# that cannot be sent because JIRA is down, slow, or overloaded is spooled
+# and retried by the dispatcher, after a delay that doubles with each
+# attempt from RETRY_BASE_DELAY up to RETRY_MAX_DELAY, jittered so that
+# retries do not arrive together, and dropped after max_retries attempts.
+REQUEST_TIMEOUT = 10
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 600
+MAX_RETRIES = 10
+
+# raised when a ticket could not be sent for a reason that may pass
+class TransientError(Exception):
+    pass
+
+# raised when JIRA refuses to update an issue for a reason that will not
+# pass, such as the issue having been deleted or moved
+class IssueRejected(Exception):
+    pass
+
+# whether a request failed before it reached JIRA, so that sending it again
+# cannot open a second issue; after a read timeout, JIRA may have opened it
+def not_sent(requests, e):
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], 'reason', None) if e.args else None
+    return isinstance(reason, requests.packages.urllib3.exceptions.ConnectTimeoutError)
 
 # creates outbound message from alert payload contents
-# and attempts to send to the specified endpoint
-def send_message(config):
-    ISSUE_REST_PATH = "/rest/api/latest/issue"
+# and attempts to send to the specified endpoint; returns the
+# key of the new issue, or False
+def send_message(config, session=None):
+    requests = load_requests()
+    if session is None:
+        session = requests
     url = config.get('jira_url')
     jira_url = url + ISSUE_REST_PATH
     username = config.get('username')
@@ -29,12 +108,529 @@ def send_message(config):
     # create outbound request object
     try:
         headers = {"Content-Type": "application/json"}
-        result = requests.post(url=jira_url, data=body, headers=headers, auth=(username, password))
-        if result.status_code != 200:
-            print >> sys.stderr, "ERROR: %s" % str(result.json())
+        result = session.post(url=jira_url, data=body, headers=headers, auth=(username, password),
+                              timeout=request_timeout(config))
+    except requests.RequestException, e:
+        if not_sent(requests, e):
+            raise TransientError(e)
+        print >> sys.stderr, "ERROR Error sending message: %s" % e
+        return False
     except Exception, e:
         print >> sys.stderr, "ERROR Error sending message: %s" % e
         return False
+    if result.status_code >= 500 or result.status_code == 429:
+        raise TransientError("HTTP %d" % result.status_code)
+    # JIRA answers 201 Created for a new issue
+    if result.status_code not in (200, 201):
+        try:
+            print >> sys.stderr, "ERROR: %s" % str(result.json())
+        except ValueError:
+            print >> sys.stderr, "ERROR: HTTP %d" % result.status_code
+        return False
+    try:
+        return result.json().get('key') or True
+    except ValueError:
+        return True
+
+# adds the firings gathered for an existing issue to it in one request
+def update_issue(config, issue, tickets, repeats, session):
+    requests = load_requests()
+    url = config.get('jira_url') + ISSUE_REST_PATH + '/' + issue
+    auth = (config.get('username'), config.get('password'))
+    headers = {"Content-Type": "application/json"}
+    update = config.get('dedup_action') == 'update'
+    try:
+        if update:
+            body = json.dumps({"fields": {"summary": tickets[-1].get('summary'),
+                                          "description": tickets[-1].get('description')}})
+            result = session.put(url=url, data=body, headers=headers, auth=auth,
+                                 timeout=request_timeout(config))
+        else:
+            text = "\n\n".join(ticket.get('description') or ticket.get('summary') or ''
+                                for ticket in tickets)
+            if repeats > len(tickets):
+                text = "Alert fired %d more times, the last %d:\n\n%s" % (repeats, len(tickets), text)
+            body = json.dumps({"body": text})
+            result = session.post(url=url + '/comment', data=body, headers=headers, auth=auth,
+                                  timeout=request_timeout(config))
+    except requests.RequestException, e:
+        # an update can be sent twice, a comment only if it was never sent
+        if (update and isinstance(e, (requests.ConnectionError, requests.Timeout))) or not_sent(requests, e):
+            raise TransientError(e)
+        print >> sys.stderr, "ERROR Error updating %s: %s" % (issue, e)
+        return False
+    except Exception, e:
+        print >> sys.stderr, "ERROR Error updating %s: %s" % (issue, e)
+        return False
+    if result.status_code >= 500 or result.status_code == 429:
+        raise TransientError("HTTP %d" % result.status_code)
+    if 400 <= result.status_code < 500:
+        raise IssueRejected("HTTP %d" % result.status_code)
+    if result.status_code not in (200, 201, 204):
+        print >> sys.stderr, "ERROR Error updating %s: HTTP %d" % (issue, result.status_code)
+        return False
+    return True
+
+class TicketIndex(object):
+    def __init__(self, path=TICKET_INDEX):
+        self.path = path
+        self.lock = threading.Lock()
+        self.key_locks = {}  # key -> [lock, threads using it]
+        self.pending = {}  # (jira_url, issue) -> [config, recent tickets, repeats, keys]
+        self.last_flush = time.time()
+
+    # returns the dedup key of a ticket, or None if the alert does not
+    # deduplicate its tickets
+    def key(self, config, result):
+        fields = [f.strip() for f in (config.get('dedup_fields') or '').split(',') if f.strip()]
+        if not fields or result is None:
+            return None
+        values = [config.get('jira_url'), config.get('project_key')]
+        values.extend('%s=%s' % (f, result.get(f, '')) for f in fields)
+        return hashlib.sha1('\0'.join(v.encode('utf-8') if isinstance(v, unicode) else str(v)
+                                      for v in values)).hexdigest()
+
+    # opens a ticket, unless one is open for its dedup key, in which case the
+    # ticket is gathered to be added to it by flush; returns False if it
+    # could not be sent
+    def file(self, config, result, session):
+        key = self.key(config, result)
+        if key is None:
+            return send_message(config, session)
+        # a key is sent by one thread, and one process, at a time, so that
+        # its repeats find the issue it opens
+        with self.key_locked(key):
+            issue = self.lookup(key, config)
+            if issue is not None:
+                self.gather(key, issue, config)
+                return True
+            issue = send_message(config, session)
+            if isinstance(issue, basestring):
+                self.record(key, issue, config)
+            return issue
+
+    def gather(self, key, issue, config):
+        with self.lock:
+            entry = self.pending.setdefault((config.get('jira_url'), issue),
+                                            [config, deque(maxlen=DEDUP_MAX_COALESCED), 0, set()])
+            entry[1].append(config)
+            entry[2] += 1
+            entry[3].add(key)
+
+    # adds every gathered ticket to its issue; an update that fails for a
+    # reason that may pass is spooled to be retried
+    def flush(self, session):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.time()
+        for (_, issue), (config, tickets, repeats, keys) in pending.iteritems():
+            try:
+                self.update(config, issue, list(tickets), repeats, list(keys), session)
+            except TransientError, e:
+                retry_or_drop({'configuration': config, 'issue': issue, 'tickets': list(tickets),
+                               'repeats': repeats, 'keys': list(keys)}, e)
+
+    # adds gathered tickets to their issue; if JIRA refuses, the issue is
+    # forgotten for the keys it was opened for, and False is returned
+    def update(self, config, issue, tickets, repeats, keys, session):
+        try:
+            return update_issue(config, issue, tickets, repeats, session)
+        except IssueRejected, e:
+            print >> sys.stderr, "ERROR Error updating %s, the next alert opens a new issue: %s" % (issue, e)
+            self.forget(keys, issue)
+            return False
+
+    def due(self):
+        with self.lock:
+            return len(self.pending) > 0 and time.time() - self.last_flush >= DEDUP_FLUSH_INTERVAL
+
+    # returns the issue opened for a key, unless it was opened dedup_ttl
+    # seconds ago or more
+    def lookup(self, key, config):
+        with self.locked() as index:
+            entry = index.get(key)
+            if entry is None or time.time() - entry['created'] >= ttl(config):
+                return None
+            return entry['issue']
+
+    def record(self, key, issue, config):
+        now = time.time()
+        with self.locked() as index:
+            index[key] = {'issue': issue, 'created': now, 'expires': now + ttl(config)}
+
+    # removes the keys that still point to an issue
+    def forget(self, keys, issue):
+        with self.locked() as index:
+            for key in keys:
+                if index.get(key, {}).get('issue') == issue:
+                    del index[key]
+
+    # holds the file lock on the index while it is read, changed, and
+    # written back
+    def locked(self):
+        return _LockedIndex(self.path)
+
+    # holds the lock of a key while its issue is looked up, opened, and
+    # recorded
+    def key_locked(self, key):
+        return _KeyLock(self, key)
+
+# a thread lock per key, dropped once no thread uses it, and where there is
+# flock, a file lock shared with the other processes that file tickets. Keys
+# are spread over KEY_LOCK_FILES lock files, so that they do not pile up.
+KEY_LOCK_FILES = 256
+
+class _KeyLock(object):
+    def __init__(self, tickets, key):
+        self.tickets = tickets
+        self.key = key
+        self.fd = None
+
+    def __enter__(self):
+        tickets = self.tickets
+        with tickets.lock:
+            self.entry = tickets.key_locks.setdefault(self.key, [threading.Lock(), 0])
+            self.entry[1] += 1
+        self.entry[0].acquire()
+        try:
+            if fcntl is not None:
+                spool_dirs()
+                lock_dir = tickets.path + '.locks'
+                if not os.path.isdir(lock_dir):
+                    try:
+                        os.makedirs(lock_dir, 0700)
+                    except OSError:
+                        if not os.path.isdir(lock_dir):
+                            raise
+                name = '%d' % (int(self.key[:8], 16) % KEY_LOCK_FILES)
+                self.fd = os.open(os.path.join(lock_dir, name), os.O_RDWR | os.O_CREAT, 0600)
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except:
+            self.__exit__(*sys.exc_info())
+            raise
+
+    def __exit__(self, *exc_info):
+        tickets = self.tickets
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.entry[0].release()
+        with tickets.lock:
+            self.entry[1] -= 1
+            if self.entry[1] == 0:
+                del tickets.key_locks[self.key]
+
+class _LockedIndex(object):
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        spool_dirs()
+        self.fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0600)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            with open(self.path) as f:
+                self.index = json.load(f)
+        except (IOError, ValueError):
+            self.index = {}
+        self.text = json.dumps(self.index, sort_keys=True)
+        return self.index
+
+    def __exit__(self, *exc_info):
+        try:
+            if exc_info[0] is None:
+                now = time.time()
+                index = dict((k, v) for k, v in self.index.iteritems() if v['expires'] > now)
+                text = json.dumps(index, sort_keys=True)
+                if text != self.text:
+                    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(text)
+                    # Windows cannot rename over an existing file
+                    if os.name == 'nt' and os.path.exists(self.path):
+                        os.remove(self.path)
+                    os.rename(tmp_path, self.path)
+        finally:
+            os.close(self.fd)
+
+def ttl(config):
+    return int(config.get('dedup_ttl') or DEDUP_TTL)
+
+def request_timeout(config):
+    return float(config.get('timeout') or REQUEST_TIMEOUT)
+
+# spools a payload that could not be sent, to be retried once its delay has
+# passed; returns False if it has been tried too many times already
+def schedule_retry(payload, error):
+    config = payload.get('configuration')
+    attempts = payload.get('attempts', 0) + 1
+    if attempts > int(config.get('max_retries') or MAX_RETRIES):
+        print >> sys.stderr, "ERROR Error sending message, giving up after %d attempts: %s" % (attempts, error)
+        return False
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    delay = delay / 2.0 + random.uniform(0, delay / 2.0)
+    payload['attempts'] = attempts
+    enqueue(json.dumps(payload), time.time() + delay)
+    print >> sys.stderr, "WARN Error sending message, retry %d in %.0fs: %s" % (attempts, delay, error)
+    return True
+
+# spools a payload to be retried by the dispatcher, where there can be one
+def retry_or_drop(payload, error):
+    if fcntl is None:
+        print >> sys.stderr, "ERROR Error sending message: %s" % error
+        return False
+    return schedule_retry(payload, error)
+
+# files a ticket from the alert process; one that fails for a reason that
+# may pass is left for the dispatcher to retry
+def file_or_retry(tickets, config, result, session):
+    try:
+        return tickets.file(config, result, session)
+    except TransientError, e:
+        return retry_or_drop({'configuration': config, 'result': result}, e)
+
+# requests takes a noticeable part of a second to import, which spooling
+# alerts do not need to pay for
+def load_requests():
+    import requests
+    import requests.adapters
+    return requests
+
+def load_session(concurrency):
+    requests = load_requests()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# yields the configuration and result of each ticket the alert creates:
+# one for the alert, or with per_result set, one for each result in the
+# results_file (the first for each value of group_by, if set). The summary
+# and description can name fields of the result as ${field}; splunkd fills
+# in $result.field$ tokens from the first result before the script runs
+def ticket_configs(payload):
+    config = payload.get('configuration')
+    results_file = payload.get('results_file')
+    if alert_results.flag(config, 'per_result') and results_file:
+        results = alert_results.iter_results(results_file)
+        if config.get('group_by'):
+            results = alert_results.unique_by(results, config.get('group_by'))
+    else:
+        results = [payload.get('result')]
+    templates = [(name, alert_templates.get_template(config[name]))
+                 for name in ('summary', 'description') if config.get(name)]
+    for result in results:
+        ticket = dict(config)
+        for name, template in templates:
+            ticket[name] = template.render(result or {})
+        yield ticket, result
+
+def worker_mode(config):
+    return fcntl is not None and alert_results.flag(config, 'worker')
+
+def spool_dirs():
+    new_dir = os.path.join(SPOOL_DIR, 'new')
+    tmp_dir = os.path.join(SPOOL_DIR, 'tmp')
+    retry_dir = os.path.join(SPOOL_DIR, 'retry')
+    failed_dir = os.path.join(SPOOL_DIR, 'failed')
+    for path in (SPOOL_DIR, new_dir, tmp_dir, retry_dir, failed_dir):
+        if not os.path.isdir(path):
+            try:
+                # the spool holds credentials, so only its owner may read it
+                os.makedirs(path, 0700)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+        if path == SPOOL_DIR and not private(SPOOL_DIR):
+            raise IOError("Spool directory %s is not a private directory of this user" % SPOOL_DIR)
+    return new_dir, tmp_dir, retry_dir, failed_dir
+
+# whether a directory belongs to this user, who alone can use it
+def private(path):
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        return False
+    if not hasattr(os, 'getuid'):
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+
+# writes a payload to the spool, or to be retried at the time due; the
+# rename makes it visible to the dispatcher only once it is complete
+def enqueue(payload_text, due=None):
+    new_dir, tmp_dir, retry_dir, _ = spool_dirs()
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix='%.6f-' % (due or time.time()), suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        f.write(payload_text)
+    os.rename(tmp_path, os.path.join(new_dir if due is None else retry_dir, os.path.basename(tmp_path)))
+
+# whether any payloads are waiting to be retried
+def retries_waiting():
+    retry_dir = os.path.join(SPOOL_DIR, 'retry')
+    return os.path.isdir(retry_dir) and len(os.listdir(retry_dir)) > 0
+
+# takes the dispatcher lock without waiting; returns the open lock file,
+# or None if another dispatcher holds it
+def try_lock():
+    spool_dirs()
+    fd = os.open(DISPATCHER_LOCK, os.O_RDWR | os.O_CREAT, 0600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError:
+        os.close(fd)
+        return None
+    return fd
+
+def ensure_dispatcher():
+    fd = try_lock()
+    if fd is None:
+        return  # one is running, and will see the new payload
+    os.close(fd)
+    log_dir = os.path.dirname(DISPATCHER_LOG)
+    if not os.path.isdir(log_dir):
+        try:
+            os.makedirs(log_dir)
+        except OSError:
+            if not os.path.isdir(log_dir):
+                raise
+    with open(os.devnull, 'r+') as devnull:
+        with open(DISPATCHER_LOG, 'a') as log:
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), '--dispatch'],
+                             stdin=devnull, stdout=devnull, stderr=log,
+                             close_fds=True, preexec_fn=os.setsid)
+
+class Dispatcher(object):
+    def __init__(self, concurrency=DISPATCHER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.session = load_session(concurrency)
+        self.queue = Queue.Queue(concurrency * 2)
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.tickets = TicketIndex()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        for i in range(concurrency):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+
+    def work(self):
+        while True:
+            path = self.queue.get()
+            try:
+                self.deliver(path)
+                os.remove(path)
+            except Exception, e:
+                self.set_aside(path, e)
+            finally:
+                with self.lock:
+                    self.in_flight.discard(path)
+
+    # keeps a payload that could not be delivered or retried in the failed
+    # directory, where it is no longer sent
+    def set_aside(self, path, error):
+        failed_path = os.path.join(spool_dirs()[3], os.path.basename(path))
+        try:
+            os.rename(path, failed_path)
+        except OSError, e:
+            print >> sys.stderr, "ERROR Unexpected error sending %s: %s; could not move it to %s: %s" % (
+                path, error, failed_path, e)
+        else:
+            print >> sys.stderr, "ERROR Unexpected error sending %s, moved to %s: %s" % (path, failed_path, error)
+
+    def deliver(self, path):
+        with open(path) as f:
+            payload = json.load(f)
+        config = payload.get('configuration')
+        try:
+            if 'issue' in payload:
+                # gathered tickets whose update is being retried
+                sent = self.tickets.update(config, payload['issue'], payload['tickets'],
+                                           payload['repeats'], payload.get('keys', []), self.session)
+            else:
+                sent = self.tickets.file(config, payload.get('result'), self.session)
+        except TransientError, e:
+            if schedule_retry(payload, e):
+                self.retried += 1
+                return
+            sent = False
+        if sent:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    # moves the retries that are due to the spool; returns whether any
+    # are still waiting
+    def promote(self, retry_dir, new_dir):
+        now = time.time()
+        waiting = False
+        for name in os.listdir(retry_dir):
+            try:
+                due = float(name.split('-', 1)[0])
+            except ValueError:
+                continue
+            if due <= now:
+                os.rename(os.path.join(retry_dir, name), os.path.join(new_dir, name))
+            else:
+                waiting = True
+        return waiting
+
+    # queues every spooled payload not already being sent; returns
+    # whether there were any
+    def scan(self, new_dir):
+        names = sorted(os.listdir(new_dir))
+        for name in names:
+            path = os.path.join(new_dir, name)
+            with self.lock:
+                if path in self.in_flight:
+                    continue
+                self.in_flight.add(path)
+            self.queue.put(path)
+        return len(names) > 0
+
+    def busy(self):
+        with self.lock:
+            return len(self.in_flight) > 0
+
+    def run(self, lock_fd, idle_timeout=DISPATCHER_IDLE_TIMEOUT):
+        new_dir, _, retry_dir, _ = spool_dirs()
+        last_active = time.time()
+        while True:
+            waiting = self.promote(retry_dir, new_dir)
+            if self.scan(new_dir) or self.busy():
+                last_active = time.time()
+                if self.tickets.due():
+                    self.tickets.flush(self.session)
+                    continue
+            elif self.tickets.pending:
+                self.tickets.flush(self.session)
+                continue
+            elif waiting:
+                last_active = time.time()
+            elif time.time() - last_active >= idle_timeout:
+                # a payload spooled while the lock was held relies on this
+                # dispatcher to send it, so look once more after letting go
+                os.close(lock_fd)
+                if not os.listdir(new_dir) and not os.listdir(retry_dir):
+                    break
+                lock_fd = try_lock()
+                if lock_fd is None:
+                    break
+                continue
+            time.sleep(DISPATCHER_POLL_INTERVAL)
+        print >> sys.stderr, "INFO Dispatcher idle, exiting after %d sent, %d failed, %d retried" % (
+            self.sent, self.failed, self.retried)
+
+def dispatch():
+    lock_fd = try_lock()
+    if lock_fd is None:
+        return  # another dispatcher is running
+    os.ftruncate(lock_fd, 0)
+    os.write(lock_fd, str(os.getpid()))
+    print >> sys.stderr, "INFO Dispatcher started, pid %d" % os.getpid()
+    Dispatcher().run(lock_fd)
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--execute":
@@ -43,10 +639,32 @@ if __name__ == "__main__":
             payload = json.loads(sys.stdin.read())
             config = payload.get('configuration')
 
-            send_message(config)
+            if worker_mode(config):
+                for ticket, result in ticket_configs(payload):
+                    enqueue(json.dumps({'configuration': ticket, 'result': result}))
+                ensure_dispatcher()
+            else:
+                tickets = TicketIndex()
+                if alert_results.flag(config, 'per_result'):
+                    concurrency = int(config.get('max_concurrency') or MAX_CONCURRENCY)
+                    session = load_session(concurrency)
+                    sent, failed = alert_results.run_concurrently(
+                        ticket_configs(payload),
+                        lambda (ticket, result): file_or_retry(tickets, ticket, result, session),
+                        concurrency)
+                    print >> sys.stderr, "INFO Filed %d tickets, %d failed" % (sent, failed)
+                else:
+                    session = load_requests().Session()
+                    for ticket, result in ticket_configs(payload):
+                        file_or_retry(tickets, ticket, result, session)
+                tickets.flush(session)
+                if fcntl is not None and retries_waiting():
+                    ensure_dispatcher()
         except Exception, e:
             print >> sys.stderr, "ERROR Unexpected error: %s" % e
             sys.exit(3)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--dispatch":
+        dispatch()
     else:
         print >> sys.stderr, "FATAL Unsupported execution mode (expected --execute flag)"
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)